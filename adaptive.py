@@ -0,0 +1,261 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+import solver
+from solver import ENGINE_CONSTRAINED, ENGINE_EXACT_COVER, ENGINE_PORTFOLIO, ENGINE_PROCESS_POOL, \
+    ENGINE_VECTORIZED, SEARCH_CLASSES, all_dates
+from bitboard import ALL_BRICKS, blocked_mask, compact, from_board
+from cancel import RESULT_TIMEOUT, CancelToken, SolveInterrupted
+from exact_cover import ExactCoverSolver
+from instrument import Instrument, SearchStats
+from portfolio import RandomizedSearch
+from encoding import table_digest
+from solution_db import layout_digest
+
+# 默认统计文件（在程序所在目录）
+STATS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine_stats.json")
+STATS_VERSION = 2
+# 每记录多少次求解保存一次统计文件
+SAVE_BATCH = 16
+
+# 没有统计时使用的策略（引擎, 并行数）
+DEFAULT_STRATEGY = (ENGINE_EXACT_COVER, 1)
+# 单进程即可运行的引擎
+SINGLE_PROCESS_ENGINES = [ENGINE_EXACT_COVER, ENGINE_CONSTRAINED, ENGINE_VECTORIZED, ENGINE_PORTFOLIO]
+# 多进程运行的引擎
+MULTI_PROCESS_ENGINES = [ENGINE_PROCESS_POOL, ENGINE_PORTFOLIO]
+
+# 训练时每种策略的超时秒数，超时按未找到记录
+TRAIN_TIMEOUT = 10.0
+
+
+def candidate_strategies(processes: int = None) -> List[Tuple[str, int]]:
+    """
+    可选的策略[(引擎, 并行数)]：单进程引擎，以及CPU多于一核时的多进程引擎
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    strategies = [(engine, 1) for engine in SINGLE_PROCESS_ENGINES]
+    if processes > 1:
+        strategies += [(engine, processes) for engine in MULTI_PROCESS_ENGINES]
+    return strategies
+
+
+def strategy_key(engine: str, workers: int) -> str:
+    return "%s:%s" % (engine, workers)
+
+
+def stats_scope(processes: int = None) -> str:
+    """
+    统计的适用范围：当前配置（日历板布局和放置表的摘要）和CPU核数，不同配置或机器的统计互不混用
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    digest = hashlib.sha1(layout_digest() + table_digest()).hexdigest()
+    return "%s-%scpu" % (digest[:16], processes)
+
+
+class StatsStore:
+    """
+    按日期记录各策略的统计（运行次数、平均耗时、平均步数、未找到次数），保存为JSON
+    选择策略时取该日期平均耗时最短且每次都找到解的策略，没有统计时使用默认策略
+    统计按适用范围（见stats_scope）分开保存，只使用当前范围的统计；可在多个线程中使用
+    """
+
+    def __init__(self, file: str = STATS_FILE, scope: str = None):
+        self.file = file
+        self.scope = scope if scope is not None else stats_scope()
+        # 适用范围 -> 日期（如"01-31"） -> 策略（如"exact_cover:1"） -> 统计
+        self.__scopes: Dict[str, Dict[str, Dict[str, dict]]] = {}
+        if file is not None and os.path.exists(file):
+            with open(file, "r") as data:
+                content = json.load(data)
+            if content.get("version") == STATS_VERSION:
+                self.__scopes = content["scopes"]
+        self.__dates = self.__scopes.setdefault(self.scope, {})
+        self.__lock = threading.Lock()
+        # 上次保存之后记录的求解次数
+        self.__unsaved = 0
+
+    @staticmethod
+    def date_key(month: int, day: int) -> str:
+        """
+        日期（月份和日期从0开始）对应的键
+        """
+        return "%02d-%02d" % (month + 1, day + 1)
+
+    def strategies(self, month: int, day: int) -> Dict[str, dict]:
+        """
+        指定日期已记录的各策略统计
+        """
+        with self.__lock:
+            return {k: dict(v) for k, v in self.__dates.get(self.date_key(month, day), {}).items()}
+
+    def record(self, month: int, day: int, engine: str, workers: int, seconds: float, nodes: int, found: bool):
+        """
+        记录一次求解（超时或没有找到解时found为False）
+        """
+        with self.__lock:
+            entries = self.__dates.setdefault(self.date_key(month, day), {})
+            entry = entries.setdefault(strategy_key(engine, workers), {"runs": 0, "seconds": 0.0, "nodes": 0.0,
+                                                                       "failures": 0})
+            entry["runs"] += 1
+            # 增量更新平均值
+            entry["seconds"] += (seconds - entry["seconds"]) / entry["runs"]
+            entry["nodes"] += (nodes - entry["nodes"]) / entry["runs"]
+            if not found:
+                entry["failures"] += 1
+            self.__unsaved += 1
+
+    def choose(self, month: int, day: int, candidates: List[Tuple[str, int]] = None) -> Tuple[str, int]:
+        """
+        选择预计最快的策略(引擎, 并行数)，只在candidates中选择（默认为candidate_strategies()）
+        """
+        if candidates is None:
+            candidates = candidate_strategies()
+        entries = self.strategies(month, day)
+        best = None
+        best_seconds = None
+        for engine, workers in candidates:
+            entry = entries.get(strategy_key(engine, workers))
+            if entry is None or entry["failures"] > 0:
+                continue
+            if best is None or entry["seconds"] < best_seconds:
+                best = (engine, workers)
+                best_seconds = entry["seconds"]
+        return best if best is not None else DEFAULT_STRATEGY
+
+    def save(self):
+        """
+        保存所有统计（先写临时文件再替换，其它进程不会读到写了一半的文件）
+        """
+        with self.__lock:
+            content = json.dumps({"version": STATS_VERSION, "scopes": self.__scopes}, indent=1, sort_keys=True)
+            self.__unsaved = 0
+        temp_file = "%s.%s.tmp" % (self.file, os.getpid())
+        with open(temp_file, "w") as output:
+            output.write(content)
+        os.replace(temp_file, self.file)
+
+    def flush(self, force: bool = False):
+        """
+        分批保存：自上次保存以来记录了SAVE_BATCH次求解时才保存，force为True时只要有新记录就保存
+        """
+        if self.__unsaved >= SAVE_BATCH or force and self.__unsaved > 0:
+            self.save()
+
+
+# 默认统计库（首次使用时加载，进程退出时保存未保存的记录）
+__store = None
+__store_lock = threading.Lock()
+
+
+def default_store() -> StatsStore:
+    global __store
+    with __store_lock:
+        if __store is None:
+            __store = StatsStore()
+            atexit.register(__store.flush, True)
+        return __store
+
+
+def solve_adaptive(canvas: "Canvas", month: int, day: int, instrument: Instrument = None, token: CancelToken = None,
+                   timeout: float = None, store: StatsStore = None) -> (float, int, Tuple[int, ...], SearchStats):
+    """
+    按统计选择引擎和并行数后调用parallel_main，并记录本次求解（分批保存，见StatsStore.flush）；参数和返回值与parallel_main相同
+    """
+    if store is None:
+        store = default_store()
+    engine, workers = store.choose(month, day)
+    if instrument is not None and instrument.log is not None:
+        instrument.log("[Adaptive] %02d-%02d: engine %s, %s workers" % (month + 1, day + 1, engine, workers))
+    try:
+        result = solver.parallel_main(canvas, month, day, engine, workers, instrument, token, timeout)
+    except SolveInterrupted as e:
+        if e.reason == RESULT_TIMEOUT:
+            # 超时说明这个策略对该日期太慢；主动取消不代表策略的好坏，不记录
+            store.record(month, day, engine, workers, e.seconds, e.tries, False)
+            store.flush()
+        raise
+    store.record(month, day, engine, workers, result[0], result[1], result[2] is not None)
+    store.flush()
+    return result
+
+
+def solve_placements(month: int, day: int, engine: str = ENGINE_EXACT_COVER) -> (Tuple[int, ...], int):
+    """
+    在当前进程中用单进程引擎解一个日期（月份和日期从0开始），返回紧凑谜底（无解时为None）和步数
+    """
+    if engine == ENGINE_EXACT_COVER:
+        exact_cover = ExactCoverSolver(month, day)
+        board = exact_cover.solve()
+        return (from_board(board) if board is not None else None), exact_cover.tries
+    search = RandomizedSearch() if engine == ENGINE_PORTFOLIO else SEARCH_CLASSES[engine]()
+    solution = []
+    if not search.solve(blocked_mask(month, day), ALL_BRICKS, solution):
+        return None, search.tries
+    return compact(solution), search.tries
+
+
+def train(dates: List[Tuple[int, int]], store: StatsStore, strategies: List[Tuple[str, int]],
+          timeout: float = TRAIN_TIMEOUT):
+    """
+    对每个日期（从1开始）依次运行所有策略并记录统计
+    """
+    for month, day in dates:
+        for engine, workers in strategies:
+            start_time = time.time()
+            try:
+                result = solver.parallel_main(None, month - 1, day - 1, engine, workers, timeout=timeout)
+                tries = result[1]
+                found = result[2] is not None
+            except SolveInterrupted as e:
+                tries = e.tries
+                found = False
+            store.record(month - 1, day - 1, engine, workers, time.time() - start_time, tries, found)
+        engine, workers = store.choose(month - 1, day - 1, strategies)
+        print("%02d-%02d: %s x%s" % (month, day, engine, workers))
+    store.save()
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Record per-date engine statistics and pick the fastest strategy")
+    parser.add_argument("--stats", default=STATS_FILE, help="statistics file")
+    parser.add_argument("--train", action="store_true", help="run every strategy on every date and record stats")
+    parser.add_argument("--month", type=int, help="month, 1-12 (all dates when omitted)")
+    parser.add_argument("--day", type=int, help="day, 1-31")
+    parser.add_argument("--timeout", type=float, default=TRAIN_TIMEOUT, help="seconds per strategy when training")
+    options = parser.parse_args(args)
+
+    store = StatsStore(options.stats)
+    if options.month is not None and options.day is not None:
+        dates = [(options.month, options.day)]
+    else:
+        dates = all_dates()
+    strategies = candidate_strategies()
+    if options.train:
+        train(dates, store, strategies, options.timeout)
+        print("statistics saved to %s" % options.stats)
+        return 0
+
+    # 列出每个日期选择的策略
+    chosen = {}
+    for month, day in dates:
+        strategy = store.choose(month - 1, day - 1, strategies)
+        chosen[strategy] = chosen.get(strategy, 0) + 1
+        if len(dates) == 1:
+            print("%02d-%02d: %s x%s %s" % (month, day, strategy[0], strategy[1],
+                                            json.dumps(store.strategies(month - 1, day - 1))))
+    for (engine, workers), n in sorted(chosen.items(), key=lambda item: -item[1]):
+        print("%s x%s: %s dates" % (engine, workers, n))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import List, Tuple
+import config_select
+
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
+
+import solver
+from solver import ENGINE_EXACT_COVER, ENGINES, PRUNE_RULES, all_dates, prune_stats
+from instrument import PROFILE_CPROFILE, PROFILE_SAMPLING, Instrument, Profiler
+from puzzle_config import use_config
+
+# 快速模式：每月选两天，覆盖各行各列
+QUICK_DATES = [(m + 1, d) for m in range(12) for d in (1 + m % 7, 15 + m % 14)]
+
+# 默认基准文件
+BASELINE_FILE = "benchmark_baseline.json"
+
+# 超过基准的多少倍视为性能回退
+DEFAULT_THRESHOLD = 0.2
+# 耗时差异小于此值（秒）时不算回退，避免毫秒级的计时抖动
+MIN_SLOWDOWN = 0.01
+
+
+def run_date(month: int, day: int, engine: str, workers: int, trace_memory: bool = False,
+             profiler: Profiler = None) -> dict:
+    """
+    解一个日期（月份和日期从1开始）并记录指标
+    trace_memory为True时用tracemalloc记录本日期Python内存分配的峰值（只含主进程，搜索会明显变慢）
+    profiler为性能剖析器（各日期累计），剖析时耗时偏高
+    """
+    # Linux下ru_maxrss单位为KB；它只增不减，因此记录本日期内的增长，而不是进程启动以来的峰值
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.time()
+    try:
+        result = solver.parallel_main(None, month - 1, day - 1, engine, workers, Instrument(profiler=profiler))
+    finally:
+        seconds = time.time() - start_time
+        if trace_memory:
+            alloc_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    record = {
+        "date": "%02d-%02d" % (month, day),
+        "found": result[2] is not None,
+        "seconds": seconds,
+        "nodes": result[1],
+        "nodes_per_second": result[1] / seconds if seconds > 0 else 0.0,
+        "prunes": prune_stats(result[3].prunes),
+        # 本进程内存峰值的增长（只有超过之前各日期的峰值时才非0）
+        "rss_growth_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        # 已结束的子进程中内存峰值最大的一个（多进程引擎的工作进程）
+        "children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+    if trace_memory:
+        record["alloc_peak_kb"] = alloc_peak // 1024
+    return record
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    百分位数（最近秩法），q取0到1
+    """
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def run(dates: List[Tuple[int, int]], engine: str, workers: int, trace_memory: bool = False,
+        profiler: Profiler = None) -> dict:
+    """
+    按给定引擎和并行数依次解所有日期
+    """
+    records = []
+    start_time = time.time()
+    for month, day in dates:
+        record = run_date(month, day, engine, workers, trace_memory, profiler)
+        records.append(record)
+        print("%s %8.3fs %8d nodes %10.0f nodes/s" % (record["date"], record["seconds"], record["nodes"],
+                                                     record["nodes_per_second"]))
+    total = time.time() - start_time
+    nodes = sum(r["nodes"] for r in records)
+    seconds = [r["seconds"] for r in records]
+    prunes = {}
+    for name in PRUNE_RULES:
+        prunes[name] = sum(r["prunes"][name] for r in records)
+    return {
+        "engine": engine,
+        "workers": workers,
+        "dates": len(records),
+        "seconds": total,
+        "nodes": nodes,
+        "nodes_per_second": nodes / total if total > 0 else 0.0,
+        # 单个日期耗时的中位数和p99（尾延迟）
+        "median_seconds": percentile(seconds, 0.5),
+        "p99_seconds": percentile(seconds, 0.99),
+        "prunes": prunes,
+        # 整个运行的内存峰值：本进程和最大的子进程
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        "unsolved": [r["date"] for r in records if not r["found"]],
+        "records": records,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    与基准对比，返回性能回退的说明（耗时或步数超过基准的(1 + threshold)倍）
+    """
+    regressions = []
+    if report["engine"] != baseline["engine"] or report["workers"] != baseline["workers"]:
+        regressions.append("baseline was recorded with engine=%s workers=%s" % (baseline["engine"],
+                                                                              baseline["workers"]))
+    base_records = {r["date"]: r for r in baseline["records"]}
+    for r in report["records"]:
+        base = base_records.get(r["date"])
+        if base is None:
+            continue
+        if r["found"] != base["found"]:
+            regressions.append("%s: found %s, baseline %s" % (r["date"], r["found"], base["found"]))
+        if r["seconds"] > base["seconds"] * (1 + threshold) and r["seconds"] - base["seconds"] > MIN_SLOWDOWN:
+            regressions.append("%s: %.3fs, baseline %.3fs" % (r["date"], r["seconds"], base["seconds"]))
+        if r["nodes"] > base["nodes"] * (1 + threshold):
+            regressions.append("%s: %s nodes, baseline %s" % (r["date"], r["nodes"], base["nodes"]))
+    return regressions
+
+
+def print_summary(report: dict, slowest: int):
+    print("\nengine=%s workers=%s dates=%s" % (report["engine"], report["workers"], report["dates"]))
+    print("total %.3fs, %s nodes, %.0f nodes/s" % (report["seconds"], report["nodes"], report["nodes_per_second"]))
+    print("peak RSS %s KB, children %s KB" % (report["peak_rss_kb"], report["children_peak_rss_kb"]))
+    records = report["records"]
+    if len(records) > 0:
+        r = max(records, key=lambda r: r["rss_growth_kb"])
+        print("largest RSS growth +%s KB on %s" % (r["rss_growth_kb"], r["date"]))
+        if "alloc_peak_kb" in records[0]:
+            r = max(records, key=lambda r: r["alloc_peak_kb"])
+            print("largest allocation peak %s KB on %s" % (r["alloc_peak_kb"], r["date"]))
+    print("per date: median %.3fs, p99 %.3fs" % (report["median_seconds"], report["p99_seconds"]))
+    print("prunes %s" % report["prunes"])
+    if len(report["unsolved"]) > 0:
+        print("unsolved %s" % report["unsolved"])
+    if slowest > 0:
+        print("\nslowest dates:")
+        for r in sorted(report["records"], key=lambda r: r["seconds"], reverse=True)[:slowest]:
+            print("%s %8.3fs %8d nodes" % (r["date"], r["seconds"], r["nodes"]))
+
+
+def print_versus(report: dict, other: dict):
+    """
+    对比两个引擎单个日期耗时的中位数和p99（例如随机组合搜索与确定顺序搜索）
+    """
+    print("\n%-8s %12s %12s" % ("", report["engine"], other["engine"]))
+    for name in ("median_seconds", "p99_seconds"):
+        ratio = other[name] / report[name] if report[name] > 0 else 0.0
+        print("%-8s %11.3fs %11.3fs  %.2fx" % (name.split("_")[0], report[name], other[name], ratio))
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Calendar puzzle solver benchmark")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("--engine", default=ENGINE_EXACT_COVER, choices=ENGINES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="threads or processes")
+    parser.add_argument("--full", action="store_true", help="all 366 dates (default: quick subset)")
+    parser.add_argument("--slowest", type=int, default=10, help="show the N slowest dates in full mode")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown ratio")
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--versus", choices=ENGINES,
+                        help="also run this engine and compare median/p99 solve times (e.g. portfolio vs process_pool)")
+    parser.add_argument("--memory", action="store_true",
+                        help="trace Python allocations per date with tracemalloc (slows the search down)")
+    parser.add_argument("--profile", choices=[PROFILE_CPROFILE, PROFILE_SAMPLING],
+                        help="profile the search over all dates (timings include the profiling overhead)")
+    parser.add_argument("--profile-output", help="also write the profile (pstats or folded stacks) to this file")
+    options = parser.parse_args(args)
+    if options.config is not None:
+        use_config(options.config)
+
+    dates = all_dates() if options.full else QUICK_DATES
+    profiler = Profiler(options.profile, options.profile_output, False) if options.profile is not None else None
+    report = run(dates, options.engine, options.workers, options.memory, profiler)
+    print_summary(report, options.slowest if options.full else 0)
+    if profiler is not None:
+        # 只剖析--engine，不含--versus
+        sys.stdout.flush()
+        profiler.dump()
+    if options.versus is not None:
+        other = run(dates, options.versus, options.workers, options.memory)
+        print_summary(other, options.slowest if options.full else 0)
+        print_versus(report, other)
+        report["versus"] = other
+
+    if options.output is not None:
+        with open(options.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if options.save_baseline:
+        with open(options.baseline, "w") as output:
+            json.dump(report, output, indent=2)
+        print("\nbaseline saved to %s" % options.baseline)
+        return 0
+
+    if not os.path.exists(options.baseline):
+        return 0
+    with open(options.baseline, "r") as data:
+        regressions = compare(report, json.load(data), options.threshold)
+    if len(regressions) > 0:
+        print("\n%s regressions against %s:" % (len(regressions), options.baseline))
+        for r in regressions:
+            print("  " + r)
+        return 1
+    print("\nno regressions against %s" % options.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+from typing import Dict, Iterator, List, Tuple
+from model import *
+from puzzle_config import compile_puzzle
+
+BOARD_SIZE = BOARD_WIDTH * BOARD_HEIGHT
+FULL_MASK = (1 << BOARD_SIZE) - 1
+
+
+def cell_bit(x: int, y: int) -> int:
+    """
+    坐标点对应的位（行对应y，列对应x）
+    """
+    return 1 << (y * BOARD_WIDTH + x)
+
+
+# 当前配置编译后的放置表（见puzzle_config），以下各表均由它建立
+PUZZLE = compile_puzzle()
+OPEN_MASK = PUZZLE.open_mask
+
+# 每个积木朝向的放置表：积木朝向 -> {左上角格 -> 掩码} 以及 {首格 -> 掩码}
+# 首格即积木首行第一个非空格，也就是掩码的最低位
+ANCHOR_MASKS: Dict[Brick, Dict[int, int]] = {}
+FIRST_CELL_MASKS: Dict[Brick, Dict[int, int]] = {}
+# 每块积木的所有放置方式：积木序号 -> [(朝向, 左上角格, 掩码)]
+BRICK_PLACEMENTS: List[List[Tuple[Brick, int, int]]] = []
+# 放置方式序号表：(积木朝向, 左上角格) -> (积木序号, 放置序号)
+PLACEMENT_NUMBERS: Dict[Tuple[Brick, int], Tuple[int, int]] = {}
+# 按首格索引的放置方式：积木序号 -> 首格 -> [(放置序号, 掩码)]
+FIRST_CELL_PLACEMENTS: List[List[List[Tuple[int, int]]]] = PUZZLE.first_cell_placements
+# 所有积木均未放置
+ALL_BRICKS = PUZZLE.all_pieces
+
+
+def __init_placements():
+    for n, raw in enumerate(BRICKS):
+        # 形状键 -> 积木朝向
+        orientations = {}
+        for b in split_brick(raw):
+            orientations[b.key] = b
+            ANCHOR_MASKS[b] = {}
+            FIRST_CELL_MASKS[b] = {}
+        placements = []
+        BRICK_PLACEMENTS.append(placements)
+        for key, anchor, mask in PUZZLE.placements[n]:
+            b = orientations[key]
+            PLACEMENT_NUMBERS[(b, anchor)] = (n, len(placements))
+            placements.append((b, anchor, mask))
+            ANCHOR_MASKS[b][anchor] = mask
+            FIRST_CELL_MASKS[b][(mask & -mask).bit_length() - 1] = mask
+
+
+__init_placements()
+
+
+def blocked_mask(month: int, day: int, *others: int) -> int:
+    """
+    初始占用掩码：禁用格和日期格均视为已占用；others为配置中月份和日期之外的目标取值（如星期）
+    """
+    return PUZZLE.blocked_mask((month, day) + others)
+
+
+def compact(solution: List[Tuple[int, int]]) -> Tuple[int, ...]:
+    """
+    把放置列表[(积木序号, 放置序号)]压缩为按积木序号排列的放置序号元组，同一种拼法结果相同
+    """
+    placements = [0] * len(solution)
+    for i, j in solution:
+        placements[i] = j
+    return tuple(placements)
+
+
+def to_board(month: int, day: int, placements: Tuple[int, ...]) -> Board:
+    """
+    把放置序号元组转换为Board（用于绘制）
+    """
+    board = Board(month, day)
+    for i, j in enumerate(placements):
+        brick, anchor, mask = BRICK_PLACEMENTS[i][j]
+        board.place(Grid(anchor % BOARD_WIDTH, int(anchor / BOARD_WIDTH)), brick)
+    return board
+
+
+def from_board(board: Board) -> Tuple[int, ...]:
+    """
+    把已放满的Board转换为放置序号元组
+    """
+    solution = []
+    for location, brick in board.bricks:
+        solution.append(PLACEMENT_NUMBERS[(brick, location.y * BOARD_WIDTH + location.x)])
+    return compact(solution)
+
+
+class BitSearch:
+    """位图深度优先搜索：每一步用任一剩余积木覆盖首个空格，不需要枚举积木顺序"""
+
+    # 每隔多少步检查一次是否已取消
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, cancel_event=None):
+        self.tries = 0
+        self.cancelled = False
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES
+        self.prunes = [0] * len(PRUNE_RULES)
+        self.__cancel_event = cancel_event
+
+    def candidates(self, occupied: int, remaining: int) -> List[Tuple[int, int, int]]:
+        """
+        覆盖首个空格的所有合法放置方式[(积木序号, 放置序号, 掩码)]
+        """
+        free = ~occupied & FULL_MASK
+        cell = (free & -free).bit_length() - 1
+        result = []
+        for i in range(len(BRICKS)):
+            if not remaining >> i & 1:
+                continue
+            for j, mask in FIRST_CELL_PLACEMENTS[i][cell]:
+                if mask & occupied:
+                    self.prunes[PRUNE_OVERLAP] += 1
+                    continue
+                # 检查是否有孤立的非法空白区域
+                if not check_zones(free & ~mask, remaining & ~(1 << i), self.prunes):
+                    continue
+                result.append((i, j, mask))
+        return result
+
+    def solve(self, occupied: int, remaining: int, solution: List[Tuple[int, int]]) -> bool:
+        """
+        搜索一个解，找到时solution为完整的放置列表
+        """
+        if remaining == 0:
+            return True
+        for i, j, mask in self.candidates(occupied, remaining):
+            self.tries += 1
+            if self.tries % self.CHECK_INTERVAL == 0 and self.__cancel_event is not None \
+                    and self.__cancel_event.is_set():
+                self.cancelled = True
+            if self.cancelled:
+                return False
+            solution.append((i, j))
+            if self.solve(occupied | mask, remaining & ~(1 << i), solution):
+                return True
+            solution.pop()
+        return False
+
+    def iter_solutions(self, occupied: int, remaining: int, solution: List[Tuple[int, int]] = None) \
+            -> Iterator[Tuple[int, ...]]:
+        """
+        逐个生成所有解（放置序号元组）
+        每一步都覆盖首个空格，一种拼法只对应一条搜索路径，因此不会重复，也无需记录已找到的解
+        """
+        if solution is None:
+            solution = []
+        if remaining == 0:
+            yield compact(solution)
+            return
+        for i, j, mask in self.candidates(occupied, remaining):
+            self.tries += 1
+            solution.append((i, j))
+            yield from self.iter_solutions(occupied | mask, remaining & ~(1 << i), solution)
+            solution.pop()
+
+    def count(self, occupied: int, remaining: int) -> int:
+        """
+        只计数，不生成解
+        """
+        if remaining == 0:
+            return 1
+        total = 0
+        for i, j, mask in self.candidates(occupied, remaining):
+            self.tries += 1
+            total += self.count(occupied | mask, remaining & ~(1 << i))
+        return total
+
+
+def iter_solutions(month: int, day: int, *others: int) -> Iterator[Tuple[int, ...]]:
+    """
+    逐个生成指定日期的所有解，可用to_board转换为Board（others见blocked_mask）
+    """
+    return BitSearch().iter_solutions(blocked_mask(month, day, *others), ALL_BRICKS)
+
+
+def iter_boards(month: int, day: int) -> Iterator[Board]:
+    """
+    逐个生成指定日期的所有解（Board）
+    """
+    for placements in iter_solutions(month, day):
+        yield to_board(month, day, placements)
+
+
+def count_solutions(month: int, day: int, *others: int) -> int:
+    """
+    统计指定日期的解的个数（others见blocked_mask）
+    """
+    return BitSearch().count(blocked_mask(month, day, *others), ALL_BRICKS)
+
+
+class BitBoard:
+    """位图日历板：占用情况保存为一个整数掩码，可替换Board用于搜索"""
+
+    def __init__(self, month: int, day: int):
+        self.__month = month
+        self.__day = day
+        self.__occupied = blocked_mask(month, day)
+        self.__remaining = ALL_BRICKS
+        self.__bricks = []
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES
+        self.prunes = [0] * len(PRUNE_RULES)
+
+    def __repr__(self):
+        result = ""
+        for b in self.__bricks:
+            result += b[0].__repr__()
+            result += "\n"
+            result += b[1].__repr__()
+            result += "\n"
+        return result
+
+    @property
+    def occupied(self) -> int:
+        return self.__occupied
+
+    @property
+    def bricks(self) -> List[Tuple[Grid, Brick]]:
+        """
+        已放置的积木[(左上角, 积木朝向)]，与Board.bricks相同
+        """
+        return [(b[0], b[1]) for b in self.__bricks]
+
+    def split_bricks(self, raw: Brick, flipped: bool) -> Tuple[Brick, ...]:
+        return split_brick(raw, flipped)
+
+    def find_location(self, brick: Brick) -> Grid:
+        # 只取第一个空格（最低的空闲位），保证积木严格按照预定顺序放入
+        free = ~self.__occupied & FULL_MASK
+        if free == 0:
+            return None
+        cell = (free & -free).bit_length() - 1
+        mask = FIRST_CELL_MASKS[brick].get(cell)
+        if mask is None or mask & self.__occupied:
+            self.prunes[PRUNE_OVERLAP] += 1
+            return None
+        # 检查是否有孤立的非法空白区域
+        if not check_zones(free & ~mask, self.__remaining & ~(1 << BRICK_NUMBERS[brick]), self.prunes):
+            return None
+        return Grid(cell % BOARD_WIDTH - brick.calc_left_displacement(), int(cell / BOARD_WIDTH))
+
+    def place(self, location: Grid, brick: Brick):
+        mask = ANCHOR_MASKS[brick][location.y * BOARD_WIDTH + location.x]
+        self.__bricks.append((location, brick, mask))
+        self.__occupied |= mask
+        self.__remaining &= ~(1 << BRICK_NUMBERS[brick])
+
+    def unplace(self):
+        lb = self.__bricks.pop()
+        self.__occupied &= ~lb[2]
+        self.__remaining |= 1 << BRICK_NUMBERS[lb[1]]
+
+    def to_board(self) -> Board:
+        """
+        转换为Board（用于绘制）
+        """
+        board = Board(self.__month, self.__day)
+        for b in self.__bricks:
+            board.place(b[0], b[1])
+        return board
+
+    def draw(self, canvas: "Canvas"):
+        self.to_board().draw(canvas)
@@ -1,198 +1,147 @@
+import argparse
+import os
+import queue
 import threading
 import datetime
-import time
 import tkinter as tk
 import tkinter.ttk
-from model import *
+import config_select
 
-failed_prefixes = {int: []}
-tries = 0
-answer: Board = None
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
 
+from solver import *
+from bitboard import iter_solutions, to_board
+from cancel import RESULT_CANCELLED
+from puzzle_config import use_config
 
-def reset():
-    """
-    重置棋盘
-    """
-    global failed_prefixes
-    global tries
-    global answer
+# 主循环轮询事件队列的间隔（毫秒）
+POLL_INTERVAL_MS = 50
 
-    failed_prefixes = {int: []}
-    tries = 0
-    answer = None
+# 事件类型（解谜线程 -> 主线程）
+EVENT_PROGRESS = "progress"
+EVENT_SOLVED = "solved"
+EVENT_FAILED = "failed"
+EVENT_INTERRUPTED = "interrupted"
+EVENT_SOLUTION = "solution"
+EVENT_EXHAUSTED = "exhausted"
 
 
-def parallel_main(canvas: Canvas, month: int, day: int) -> (float, int):
+class RiddleSession:
     """
-    多线程解谜
+    一次解谜：在后台线程中求解，进度和结果放入事件队列，由Tk主循环轮询处理（后台线程不接触控件）
+    第一个解由parallel_main求得，之后的解在翻页时从iter_solutions逐个取出
     """
-    reset()
-
-    start_time = time.time()
-    workers = []
-    for i in range(os.cpu_count()):
-        worker = Worker(month, day, i)
-        worker.start()
-        workers.append(worker)
-    for w in workers:
-        w.join()
-    if answer is not None:
-        answer.draw(canvas)
-        return (time.time() - start_time), tries
-    else:
-        return None
-
-
-class Worker(threading.Thread):
-    def __init__(self, month: int, day: int, slot: int):
-        threading.Thread.__init__(self)
-        self.__slot = slot
-        self.__board = Board(month, day)
-        self.__factory = BrickSeqFactory(BRICKS, slot)
-
-    def run(self):
-        print("[Worker-%s] Started" % self.__slot)
-        global answer
-        while answer is None:
-            bricks = self.__factory.next()
-            if len(bricks) == 0:
-                # 已遍历完所有可能
-                break
-            brick_seq = []
-            if self.__place_brick(self.__board, brick_seq, bricks, 0):
-                # 找到一个解
-                answer = self.__board
-                break
-
-    def __place_brick(self, board: Board, brick_seq: List[Brick], bricks: List[Brick], idx: int) -> bool:
-        global tries
-        if idx == len(bricks):
-            return True
-
-        # 检查是否包含失败前缀
-        if has_failed_prefix(brick_seq, bricks, idx):
-            return False
-
-        placed = False
-        for b in board.split_bricks(bricks[idx], False):
-            loc = board.find_location(b)
-            if loc is None:
-                continue
-
-            tries += 1
-            if tries % 10000 == 0:
-                print("[Worker-%s] %s: %s" % (self.__slot, time.asctime(time.localtime(time.time())), tries))
-
-            placed = True
-            brick_seq.append(b)
-            board.place(loc, b)
-            if self.__place_brick(board, brick_seq, bricks, idx + 1):
-                return True
-            board.unplace()
-            brick_seq.pop()
-
-        if not placed:
-            # 新的失败前缀
-            add_failed_prefix(brick_seq, bricks, idx)
 
-        return False
-
-
-def main(month: int, day: int):
-    """
-    单线程解谜（用于Debug）
-    """
-    reset()
-
-    start_time = time.time()
-    board = Board(month, day)
-    factory = BrickSeqFactory(BRICKS)
-    while True:
-        bricks = factory.next()
-        if len(bricks) == 0:
-            # 已遍历完所有可能
-            break
-        brick_seq = []
-        if place_brick(board, brick_seq, bricks, 0):
-            print("\nA solution is found after %s seconds!" % (time.time() - start_time))
-            board.draw()
-            exit()
-    print("\nSomething is wrong... No solution is found!")
-
-
-def place_brick(board: Board, brick_seq: List[Brick], bricks: List[Brick], idx: int) -> bool:
-    if idx == len(bricks):
+    def __init__(self, month: int, day: int, engine: str = ENGINE_GRID):
+        self.month = month
+        self.day = day
+        self.engine = engine
+        self.token = CancelToken()
+        # 事件队列：(事件类型, 数据)
+        self.events = queue.Queue()
+        # 已取出的解（放置序号元组）
+        self.solutions: List[Tuple[int, ...]] = []
+        self.exhausted = False
+        self.__generator = None
+        self.__pulling = False
+
+    def start(self):
+        threading.Thread(target=self.__solve, daemon=True).start()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def __on_progress(self, slot: int, stats: SearchStats, elapsed: float):
+        # 在工作线程中调用
+        self.events.put((EVENT_PROGRESS, (slot, stats.placements, elapsed)))
+
+    def __solve(self):
+        instrument = Instrument(self.__on_progress)
+        try:
+            result = parallel_main(None, self.month, self.day, self.engine, instrument=instrument, token=self.token)
+        except SolveInterrupted as e:
+            self.events.put((EVENT_INTERRUPTED, e.reason))
+            return
+        if result[2] is None:
+            self.events.put((EVENT_FAILED, None))
+            return
+        self.events.put((EVENT_SOLVED, result[:3]))
+
+    def request_next(self) -> bool:
+        """
+        在后台取下一个解（已在取或已取完时返回False），结果以EVENT_SOLUTION或EVENT_EXHAUSTED事件返回
+        只在主线程调用
+        """
+        if self.__pulling or self.exhausted or self.token.is_set():
+            return False
+        self.__pulling = True
+        threading.Thread(target=self.__pull, daemon=True).start()
         return True
 
-    # 检查是否包含失败前缀
-    if has_failed_prefix(brick_seq, bricks, idx):
-        return False
-
-    placed = False
-    for b in board.split_bricks(bricks[idx], False):
-        loc = board.find_location(b)
-        if loc is None:
-            continue
-
-        placed = True
-        brick_seq.append(b)
-        board.place(loc, b)
-        print(board)
-        board.draw(1000)
-        if place_brick(board, brick_seq, bricks, idx + 1):
-            return True
-        board.unplace()
-        brick_seq.pop()
-
-    if not placed:
-        # 新的失败前缀
-        add_failed_prefix(brick_seq, bricks, idx)
-
-    return False
-
-
-def has_failed_prefix(brick_seq: List[Brick], bricks: List[Brick], idx: int) -> bool:
-    prefix = get_prefix(brick_seq, bricks, idx)
-    if failed_prefixes.get(idx + 1) is None:
-        return False
-    else:
-        return prefix in failed_prefixes.get(idx + 1)
-
-
-def add_failed_prefix(brick_seq: List[Brick], bricks: List[Brick], idx: int):
-    prefix = get_prefix(brick_seq, bricks, idx)
-    if failed_prefixes.get(idx + 1) is None:
-        failed_prefixes[idx + 1] = [prefix]
-    else:
-        failed_prefixes.get(idx + 1).append(prefix)
-
-
-def get_prefix(brick_seq: List[Brick], bricks: List[Brick], idx: int) -> List[Brick]:
-    brick_seq = brick_seq.copy()
-    brick_seq.append(bricks[idx])
-    return brick_seq
+    def __pull(self):
+        if self.__generator is None:
+            self.__generator = iter_solutions(self.month, self.day)
+        seen = set(self.solutions)
+        for placements in self.__generator:
+            if self.token.is_set():
+                return
+            if placements not in seen:
+                self.events.put((EVENT_SOLUTION, placements))
+                return
+        self.events.put((EVENT_EXHAUSTED, None))
+
+    def accept(self, event: str, data):
+        """
+        主线程处理事件时更新会话状态
+        """
+        if event == EVENT_SOLVED:
+            self.solutions.append(data[2])
+        elif event == EVENT_SOLUTION:
+            self.solutions.append(data)
+            self.__pulling = False
+        elif event == EVENT_EXHAUSTED:
+            self.exhausted = True
+            self.__pulling = False
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Calendar puzzle solver")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    options = parser.parse_args()
+    if options.config is not None:
+        use_config(options.config)
+
     window = tk.Tk()
     window.title("Calendar Puzzle")
     # 初始化资源
-    puzzle_img = tk.PhotoImage(file="calendar.png")
+    puzzle_img = tk.PhotoImage(file=os.path.join(PACKAGE_DIR, "calendar.png"))
     puzzle_canvas = None
     prompt_frame = None
-    result_canvas = None
+    result_frame = None
+    # 结果页的控件
+    result_widgets = {}
+    # 当前解谜
+    session: RiddleSession = None
 
 
     def start(*args):
         global puzzle_canvas
         global prompt_frame
+        global result_frame
+        global session
+        if session is not None:
+            # 重新开始时取消上一次还在进行的解谜
+            session.cancel()
+            session = None
         if puzzle_canvas is not None:
             puzzle_canvas.destroy()
         if prompt_frame is not None:
             prompt_frame.destroy()
-        if result_canvas is not None:
-            result_canvas.destroy()
+        if result_frame is not None:
+            result_frame.destroy()
+            result_frame = None
 
         # 获取月份和日期
         puzzle_canvas = tk.Canvas(window, height=200)
@@ -218,32 +167,133 @@ if __name__ == '__main__':
         day_entry = tk.Entry(prompt_frame, textvariable=day)
         day_entry.grid(row=1, column=1)
 
+        riddle_button = tk.Button(prompt_frame, text="开始解谜")
+        riddle_button.grid(row=2, column=0)
+        cancel_button = tk.Button(prompt_frame, text="取消", state=tk.DISABLED)
+        cancel_button.grid(row=2, column=1)
+        riddle_progress = tk.ttk.Progressbar(prompt_frame, length=200, mode='indeterminate',
+                                             orient=tkinter.HORIZONTAL)
+        status = tk.StringVar()
+        tk.Label(prompt_frame, textvariable=status).grid(row=4, columnspan=2)
+        # 各工作线程最近一次报告的放置次数
+        progress = {}
+
         def riddle():
+            global session
+            try:
+                m = int(month.get()) - 1
+                d = int(day.get()) - 1
+                if not 0 <= m < 12 or not 0 <= d < 31:
+                    raise ValueError()
+            except ValueError:
+                status.set("请输入正确的月份和日期")
+                return
             # 显示进度条
-            riddle_progress = tk.ttk.Progressbar(prompt_frame, length=200, mode='indeterminate',
-                                                 orient=tkinter.HORIZONTAL)
             riddle_progress.grid(row=3, columnspan=2)
-            riddle_progress['maximum'] = 100
-            riddle_progress['value'] = 0
             riddle_progress.start()
+            riddle_button.config(state=tk.DISABLED)
+            cancel_button.config(state=tk.NORMAL, command=cancel)
+            status.set("解谜中...")
+            progress.clear()
             # 异步解谜
-            threading.Thread(target=__riddle).start()
-
-        def __riddle():
-            global result_canvas
-            result_canvas = tk.Canvas(window, width=window.winfo_width(), height=window.winfo_height())
-            result_canvas.bind("<Double-Button-1>", start)
-            result = parallel_main(result_canvas, int(month.get()) - 1, int(day.get()) - 1)
-            if result is not None:
-                # 销毁首页
-                puzzle_canvas.destroy()
-                prompt_frame.destroy()
-                # 显示谜底
-                result_canvas.create_text(5, window.winfo_height() - 1, anchor=tk.SW,
-                                          text="用时: %s 秒, 步数: %s" % (result[0], result[1]))
-                result_canvas.pack()
-
-        tk.Button(prompt_frame, text="开始解谜", command=riddle).grid(row=2, columnspan=2)
+            session = RiddleSession(m, d)
+            session.start()
+            window.after(POLL_INTERVAL_MS, poll, session)
+
+        def cancel():
+            if session is not None:
+                session.cancel()
+            cancel_button.config(state=tk.DISABLED)
+
+        def poll(current: RiddleSession):
+            """
+            在主循环中处理事件队列
+            """
+            if current is not session:
+                # 已重新开始
+                return
+            while True:
+                try:
+                    event, data = current.events.get_nowait()
+                except queue.Empty:
+                    break
+                current.accept(event, data)
+                if event == EVENT_PROGRESS:
+                    slot, placements, elapsed = data
+                    progress[slot] = placements
+                    total = sum(progress.values())
+                    status.set("已用 %.1f 秒, 步数: %s (%.0f/秒)" % (elapsed, total,
+                                                                total / elapsed if elapsed > 0 else 0.0))
+                elif event == EVENT_SOLVED:
+                    show_result(current, data[0], data[1])
+                elif event == EVENT_FAILED:
+                    stop_progress("没有找到解")
+                elif event == EVENT_INTERRUPTED:
+                    stop_progress("已取消" if data == RESULT_CANCELLED else "已超时")
+                elif event == EVENT_SOLUTION or event == EVENT_EXHAUSTED:
+                    show_page(current, len(current.solutions) - 1)
+            window.after(POLL_INTERVAL_MS, poll, current)
+
+        def stop_progress(text: str):
+            riddle_progress.stop()
+            riddle_progress.grid_remove()
+            riddle_button.config(state=tk.NORMAL)
+            cancel_button.config(state=tk.DISABLED)
+            status.set(text)
+
+        def show_result(current: RiddleSession, seconds: float, tries: int):
+            global result_frame
+            # 销毁首页
+            puzzle_canvas.destroy()
+            prompt_frame.destroy()
+            # 显示谜底和翻页按钮
+            result_frame = tk.Frame(window)
+            result_frame.pack()
+            canvas = tk.Canvas(result_frame, width=DOT_SIZE * BOARD_WIDTH, height=DOT_SIZE * BOARD_HEIGHT,
+                               highlightthickness=0)
+            canvas.bind("<Double-Button-1>", start)
+            canvas.grid(row=0, columnspan=3)
+            page = tk.IntVar(value=0)
+            prev_button = tk.Button(result_frame, text="上一个解")
+            prev_button.grid(row=1, column=0)
+            page_text = tk.StringVar()
+            tk.Label(result_frame, textvariable=page_text).grid(row=1, column=1)
+            next_button = tk.Button(result_frame, text="下一个解")
+            next_button.grid(row=1, column=2)
+            tk.Label(result_frame, text="用时: %.3f 秒, 步数: %s" % (seconds, tries)).grid(row=2, columnspan=3)
+
+            def turn(delta: int):
+                k = page.get() + delta
+                if k < len(current.solutions):
+                    show_page(current, k)
+                elif current.request_next():
+                    # 下一个解取出后由poll显示
+                    next_button.config(state=tk.DISABLED)
+                    page_text.set("查找中...")
+
+            prev_button.config(command=lambda: turn(-1))
+            next_button.config(command=lambda: turn(1))
+            result_widgets.update(canvas=canvas, page=page, page_text=page_text, prev_button=prev_button,
+                                  next_button=next_button)
+            show_page(current, 0)
+
+        def show_page(current: RiddleSession, k: int):
+            """
+            绘制第k个解（只在主线程调用）
+            """
+            if result_frame is None:
+                return
+            result_widgets["page"].set(k)
+            canvas = result_widgets["canvas"]
+            canvas.delete("all")
+            to_board(current.month, current.day, current.solutions[k]).draw(canvas)
+            total = "%s" % len(current.solutions) if current.exhausted else "%s+" % len(current.solutions)
+            result_widgets["page_text"].set("第 %s / %s 个解" % (k + 1, total))
+            result_widgets["prev_button"].config(state=tk.NORMAL if k > 0 else tk.DISABLED)
+            last = current.exhausted and k == len(current.solutions) - 1
+            result_widgets["next_button"].config(state=tk.DISABLED if last else tk.NORMAL)
+
+        riddle_button.config(command=riddle)
 
 
     # 添加菜单
@@ -257,14 +307,14 @@ if __name__ == '__main__':
 
     start()
 
-    window.geometry("%sx%s+0+0" % (DOT_SIZE * 7, DOT_SIZE * 7 + 20))
+    window.geometry("%sx%s+0+0" % (DOT_SIZE * BOARD_WIDTH, DOT_SIZE * BOARD_HEIGHT + 60))
     window.resizable(False, False)
     window.mainloop()
 
     '''test: main'''
     # parallel_main(0, 0)
     # main(0, 0)
-    '''test: place_brick'''
+    '''test: GridEngine.place_bricks'''
     # bricks = [
     #     BRICK_2.rotate().rotate(),
     #     BRICK_1.flip().rotate().rotate(),
@@ -275,5 +325,4 @@ if __name__ == '__main__':
     #     BRICK_4.rotate(),
     #     BRICK_0,
     # ]
-    # brick_seq = []
-    # place_brick(Board(6, 7), brick_seq, bricks, 0)
+    # GridEngine().place_bricks(Board(6, 7), bricks)
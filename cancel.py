@@ -0,0 +1,70 @@
+import threading
+import time
+
+# 中断原因
+RESULT_TIMEOUT = "timeout"
+RESULT_CANCELLED = "cancelled"
+
+# 搜索中每隔多少个节点检查一次是否已取消
+CHECK_INTERVAL = 64
+
+
+class SolveInterrupted(Exception):
+    """解谜被中断（超时或被取消）"""
+
+    def __init__(self, reason: str, seconds: float = 0.0, tries: int = 0):
+        Exception.__init__(self, "%s after %.3f seconds, %s tries" % (reason, seconds, tries))
+        self.reason = reason
+        self.seconds = seconds
+        self.tries = tries
+
+
+class CancelToken:
+    """取消令牌：可由任意线程取消，也可设置截止时间（time.time()的绝对时间）"""
+
+    def __init__(self, deadline: float = None):
+        self.__event = threading.Event()
+        self.__deadline = deadline
+        self.__reason = None
+
+    @staticmethod
+    def with_timeout(timeout: float) -> "CancelToken":
+        return CancelToken(time.time() + timeout)
+
+    @property
+    def reason(self) -> str:
+        return self.__reason
+
+    @property
+    def deadline(self) -> float:
+        return self.__deadline
+
+    def set_deadline(self, deadline: float):
+        """
+        设置截止时间，已有更早的截止时间时保持不变
+        """
+        if self.__deadline is None or deadline < self.__deadline:
+            self.__deadline = deadline
+
+    def cancel(self, reason: str = RESULT_CANCELLED):
+        if self.__reason is None:
+            self.__reason = reason
+        self.__event.set()
+
+    def is_set(self) -> bool:
+        """
+        是否已取消或已超时（与threading.Event.is_set兼容）
+        """
+        if self.__event.is_set():
+            return True
+        if self.__deadline is not None and time.time() >= self.__deadline:
+            self.cancel(RESULT_TIMEOUT)
+            return True
+        return False
+
+    def check(self):
+        """
+        已取消或已超时则抛出SolveInterrupted
+        """
+        if self.is_set():
+            raise SolveInterrupted(self.__reason)
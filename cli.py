@@ -0,0 +1,148 @@
+import time
+
+# 从这里开始计算启动耗时（加载搜索代码和预计算表）
+START_TIME = time.time()
+
+import argparse
+import json
+import sys
+from typing import List, Tuple
+import config_select
+
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
+
+import solver
+from solver import ENGINE_EXACT_COVER, ENGINES, all_dates
+from cancel import SolveInterrupted
+from instrument import PROFILE_CPROFILE, PROFILE_SAMPLING, Instrument, Profiler, print_log, print_progress
+from puzzle_config import use_config
+from bitboard import *
+
+STARTUP_SECONDS = time.time() - START_TIME
+
+
+# 文本版谜底中的积木符号（配置中的积木超过10块时用字母）
+PIECE_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def render_layout(month: int, day: int, placements: Tuple[int, ...], *others: int) -> List[str]:
+    """
+    文本版谜底：数字为积木序号，*为日期格（以及others所示的其它目标格，见blocked_mask），x为禁用格
+    """
+    cells = {}
+    for i, j in enumerate(placements):
+        mask = BRICK_PLACEMENTS[i][j][2]
+        while mask:
+            low = mask & -mask
+            cells[low.bit_length() - 1] = PIECE_CHARS[i]
+            mask ^= low
+    calendar = blocked_mask(month, day, *others) & OPEN_MASK
+    rows = []
+    for y in range(BOARD_HEIGHT):
+        row = ""
+        for x in range(BOARD_WIDTH):
+            cell = y * BOARD_WIDTH + x
+            if cell in cells:
+                row += cells[cell]
+            elif calendar >> cell & 1:
+                row += "*"
+            else:
+                row += "x"
+        rows.append(row)
+    return rows
+
+
+def solve(month: int, day: int, engine: str, timeout: float = None, instrument: Instrument = None) -> dict:
+    """
+    解一个日期（月份和日期从1开始），返回JSON结果，超时时status为timeout
+    instrument为进度和性能剖析选项（见parallel_main）
+    """
+    result = {"month": month, "day": day, "engine": engine, "found": False}
+    try:
+        r = solver.parallel_main(None, month - 1, day - 1, engine, instrument=instrument, timeout=timeout)
+    except SolveInterrupted as e:
+        result["status"] = e.reason
+        result["seconds"] = e.seconds
+        result["tries"] = e.tries
+        return result
+    placements = r[2]
+    if placements is None:
+        return result
+    result["found"] = True
+    result["seconds"] = r[0]
+    result["tries"] = r[1]
+    result["placements"] = list(placements)
+    result["layout"] = render_layout(month - 1, day - 1, placements)
+    return result
+
+
+def read_dates(file: str) -> List[Tuple[int, int]]:
+    """
+    读取批量日期，每行一个JSON对象，如{"month": 1, "day": 1}
+    """
+    source = sys.stdin if file == "-" else open(file, "r")
+    dates = []
+    for line in source:
+        line = line.strip()
+        if len(line) == 0:
+            continue
+        date = json.loads(line)
+        dates.append((int(date["month"]), int(date["day"])))
+    return dates
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Calendar puzzle solver (headless)")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("--month", type=int, help="month, 1-12")
+    parser.add_argument("--day", type=int, help="day, 1-31")
+    parser.add_argument("--batch", help="JSONL file of {\"month\": m, \"day\": d}, - for stdin")
+    parser.add_argument("--all", action="store_true", help="solve all 366 dates")
+    parser.add_argument("--engine", default=ENGINE_EXACT_COVER,
+                        choices=ENGINES)
+    parser.add_argument("--timeout", type=float, help="give up on a date after this many seconds")
+    parser.add_argument("--progress", action="store_true", help="print search progress and statistics to stderr")
+    parser.add_argument("--profile", choices=[PROFILE_CPROFILE, PROFILE_SAMPLING],
+                        help="profile the search and print the hottest functions to stderr")
+    parser.add_argument("--profile-output", help="also write the profile (pstats or folded stacks) to this file")
+    options = parser.parse_args(args)
+    if options.config is not None:
+        use_config(options.config)
+
+    if options.all:
+        dates = all_dates()
+    elif options.batch is not None:
+        dates = read_dates(options.batch)
+    elif options.month is not None and options.day is not None:
+        dates = [(options.month, options.day)]
+    else:
+        parser.error("one of --month/--day, --batch or --all is required")
+
+    # 所有日期共用一个剖析器，全部解完后输出累计结果
+    profiler = Profiler(options.profile, options.profile_output, False) if options.profile is not None else None
+    start_time = time.time()
+    latencies = []
+    for month, day in dates:
+        date_start = time.time()
+        instrument = Instrument(print_progress if options.progress else None, profiler=profiler,
+                                log=print_log if options.progress else None)
+        print(json.dumps(solve(month, day, options.engine, options.timeout, instrument)), flush=True)
+        latencies.append(time.time() - date_start)
+    if profiler is not None:
+        profiler.dump()
+
+    # 汇总耗时输出到stderr
+    summary = {
+        "startup": STARTUP_SECONDS,
+        "dates": len(dates),
+        "total": time.time() - start_time,
+        "mean": sum(latencies) / len(latencies) if len(latencies) > 0 else 0.0,
+        "max": max(latencies) if len(latencies) > 0 else 0.0,
+    }
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import argparse
+import os
+from typing import List
+
+# 配置文件环境变量：model在导入时读取，设置时日历板布局、积木和格子标签都取自该JSON配置（格式见puzzle_config）
+CONFIG_ENV = "PUZZLE_CONFIG"
+
+
+def select_config(args: List[str] = None):
+    """
+    入口脚本在导入搜索代码之前调用：把命令行参数中的--config写入环境变量PUZZLE_CONFIG，
+    本进程随后导入的模块（各预计算表在导入时建立）和多进程引擎的工作进程都使用该配置
+    本模块不导入model，其它参数留给入口脚本自己解析
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--config")
+    options, rest = parser.parse_known_args(args)
+    if options.config is not None:
+        os.environ[CONFIG_ENV] = os.path.abspath(options.config)
@@ -0,0 +1,166 @@
+from typing import Iterator, List, Tuple
+from bitboard import *
+
+# 每种放置方式覆盖的格子：积木序号 -> 放置序号 -> (格子序号, ...)
+PLACEMENT_CELLS: List[List[Tuple[int, ...]]] = []
+
+
+def __init_placement_cells():
+    for placements in BRICK_PLACEMENTS:
+        cells = []
+        for brick, anchor, mask in placements:
+            bits = []
+            while mask:
+                low = mask & -mask
+                bits.append(low.bit_length() - 1)
+                mask ^= low
+            cells.append(tuple(bits))
+        PLACEMENT_CELLS.append(cells)
+
+
+__init_placement_cells()
+
+
+class ConstrainedSearch:
+    """
+    最强约束格搜索：每一步选择合法放置方式最少的空格，用任一剩余积木覆盖它
+    与BitSearch接口相同，可替换用于单线程和多进程搜索
+    合法放置方式列表随搜索逐层过滤，不必每层重新扫描所有放置方式
+    """
+
+    # 每隔多少步检查一次是否已取消
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, cancel_event=None):
+        self.tries = 0
+        self.cancelled = False
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES（某个空格已无法覆盖时计入overlap）
+        self.prunes = [0] * len(PRUNE_RULES)
+        self.__cancel_event = cancel_event
+
+    @staticmethod
+    def legal_placements(occupied: int, remaining: int) -> List[Tuple[int, int, int]]:
+        """
+        剩余积木所有不与已占用格重叠的放置方式[(积木序号, 放置序号, 掩码)]
+        """
+        legal = []
+        for i in range(len(BRICKS)):
+            if not remaining >> i & 1:
+                continue
+            for j, p in enumerate(BRICK_PLACEMENTS[i]):
+                if not p[2] & occupied:
+                    legal.append((i, j, p[2]))
+        return legal
+
+    def __choose(self, occupied: int, remaining: int, legal: List[Tuple[int, int, int]]) \
+            -> List[Tuple[int, int, int]]:
+        """
+        选出合法放置方式最少的空格，返回覆盖它的候选放置方式
+        候选按积木的合法放置方式数从少到多排序（先放最难放的积木）
+        """
+        cell_counts = [0] * BOARD_SIZE
+        brick_counts = [0] * len(BRICKS)
+        for i, j, mask in legal:
+            brick_counts[i] += 1
+            for c in PLACEMENT_CELLS[i][j]:
+                cell_counts[c] += 1
+
+        for i in range(len(BRICKS)):
+            if remaining >> i & 1 and brick_counts[i] == 0:
+                # 这块积木已无处可放
+                self.prunes[PRUNE_OVERLAP] += 1
+                return []
+
+        free = ~occupied & FULL_MASK
+        best = -1
+        best_count = len(legal) + 1
+        while free:
+            low = free & -free
+            cell = low.bit_length() - 1
+            free ^= low
+            if cell_counts[cell] < best_count:
+                best = cell
+                best_count = cell_counts[cell]
+                if best_count == 0:
+                    # 这个空格已无法覆盖
+                    self.prunes[PRUNE_OVERLAP] += 1
+                    return []
+
+        bit = 1 << best
+        free = ~occupied & FULL_MASK
+        result = []
+        for i, j, mask in legal:
+            if not mask & bit:
+                continue
+            # 检查是否有孤立的非法空白区域
+            if not check_zones(free & ~mask, remaining & ~(1 << i), self.prunes):
+                continue
+            result.append((i, j, mask))
+        result.sort(key=lambda p: brick_counts[p[0]])
+        return result
+
+    def candidates(self, occupied: int, remaining: int) -> List[Tuple[int, int, int]]:
+        """
+        覆盖最强约束格的所有合法放置方式[(积木序号, 放置序号, 掩码)]
+        """
+        return self.__choose(occupied, remaining, self.legal_placements(occupied, remaining))
+
+    @staticmethod
+    def __narrow(legal: List[Tuple[int, int, int]], i: int, mask: int) -> List[Tuple[int, int, int]]:
+        # 放置积木i后仍然合法的放置方式
+        return [p for p in legal if p[0] != i and not p[2] & mask]
+
+    def solve(self, occupied: int, remaining: int, solution: List[Tuple[int, int]]) -> bool:
+        """
+        搜索一个解，找到时solution为完整的放置列表
+        """
+        return self.__solve(occupied, remaining, self.legal_placements(occupied, remaining), solution)
+
+    def __solve(self, occupied: int, remaining: int, legal: List[Tuple[int, int, int]],
+                solution: List[Tuple[int, int]]) -> bool:
+        if remaining == 0:
+            return True
+        for i, j, mask in self.__choose(occupied, remaining, legal):
+            self.tries += 1
+            if self.tries % self.CHECK_INTERVAL == 0 and self.__cancel_event is not None \
+                    and self.__cancel_event.is_set():
+                self.cancelled = True
+            if self.cancelled:
+                return False
+            solution.append((i, j))
+            if self.__solve(occupied | mask, remaining & ~(1 << i), self.__narrow(legal, i, mask), solution):
+                return True
+            solution.pop()
+        return False
+
+    def iter_solutions(self, occupied: int, remaining: int) -> Iterator[Tuple[int, ...]]:
+        """
+        逐个生成所有解（放置序号元组），每种拼法只生成一次
+        """
+        return self.__iter(occupied, remaining, self.legal_placements(occupied, remaining), [])
+
+    def __iter(self, occupied: int, remaining: int, legal: List[Tuple[int, int, int]],
+               solution: List[Tuple[int, int]]) -> Iterator[Tuple[int, ...]]:
+        if remaining == 0:
+            yield compact(solution)
+            return
+        for i, j, mask in self.__choose(occupied, remaining, legal):
+            self.tries += 1
+            solution.append((i, j))
+            yield from self.__iter(occupied | mask, remaining & ~(1 << i), self.__narrow(legal, i, mask), solution)
+            solution.pop()
+
+    def count(self, occupied: int, remaining: int) -> int:
+        """
+        只计数，不生成解
+        """
+        return self.__count(occupied, remaining, self.legal_placements(occupied, remaining))
+
+    def __count(self, occupied: int, remaining: int, legal: List[Tuple[int, int, int]]) -> int:
+        if remaining == 0:
+            return 1
+        total = 0
+        for i, j, mask in self.__choose(occupied, remaining, legal):
+            self.tries += 1
+            total += self.__count(occupied | mask, remaining & ~(1 << i), self.__narrow(legal, i, mask))
+        return total
@@ -0,0 +1,166 @@
+import argparse
+import sys
+import time
+from typing import List, Tuple
+import config_select
+
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
+
+from engines import ENGINE_CONSTRAINED, ENGINE_FACTORIES, ENGINE_FIRST_BLANK, Engine, create_engine
+from validator import validate_placements
+from puzzle_config import use_config
+
+# 对比方式：解的集合、解的个数、第一个解
+MODE_SOLUTIONS = "solutions"
+MODE_COUNTS = "counts"
+MODE_SOLVE = "solve"
+MODES = [MODE_SOLUTIONS, MODE_COUNTS, MODE_SOLVE]
+
+
+def all_targets() -> List[Tuple[int, int]]:
+    """
+    所有(月份, 日期)组合（从0开始，含2月30日等不存在的日期）
+    """
+    from model import TARGET_CELLS, TARGET_DAY, TARGET_MONTH
+
+    return [(m, d) for m in range(len(TARGET_CELLS[TARGET_MONTH])) for d in range(len(TARGET_CELLS[TARGET_DAY]))]
+
+
+def check_solutions(engine: Engine, month: int, day: int) -> (set, List[str]):
+    """
+    枚举一个日期的所有解并逐个校验，返回(解的集合, 问题说明)
+    """
+    problems = []
+    solutions = set()
+    for s in engine.enumerate(month, day):
+        errors = validate_placements(month, day, s)
+        if len(errors) > 0:
+            problems.append("%s: invalid solution %s: %s" % (engine.name, list(s), "; ".join(errors)))
+        if s in solutions:
+            problems.append("%s: duplicate solution %s" % (engine.name, list(s)))
+        solutions.add(s)
+    return solutions, problems
+
+
+def compare_date(first: Engine, second: Engine, month: int, day: int, mode: str) -> List[str]:
+    """
+    对比两个引擎在一个日期上的结果，返回不一致之处（一致时为空列表）
+    """
+    if mode == MODE_SOLUTIONS:
+        a, problems = check_solutions(first, month, day)
+        b, more = check_solutions(second, month, day)
+        problems += more
+        for s in sorted(a - b)[:3]:
+            problems.append("only %s found %s" % (first.name, list(s)))
+        for s in sorted(b - a)[:3]:
+            problems.append("only %s found %s" % (second.name, list(s)))
+        if len(a) != len(b):
+            problems.append("%s found %s solutions, %s found %s" % (first.name, len(a), second.name, len(b)))
+        return problems
+    if mode == MODE_COUNTS:
+        a = first.count(month, day)
+        b = second.count(month, day)
+        return [] if a == b else ["%s counted %s, %s counted %s" % (first.name, a, second.name, b)]
+    assert mode == MODE_SOLVE
+    problems = []
+    found = []
+    for engine in (first, second):
+        s = engine.solve(month, day)
+        found.append(s is not None)
+        if s is not None:
+            errors = validate_placements(month, day, s)
+            if len(errors) > 0:
+                problems.append("%s: invalid solution %s: %s" % (engine.name, list(s), "; ".join(errors)))
+    if found[0] != found[1]:
+        problems.append("%s found %s, %s found %s" % (first.name, found[0], second.name, found[1]))
+    return problems
+
+
+def engine_result(engine: Engine, month: int, day: int, mode: str):
+    """
+    引擎在一个日期上的结果：解的集合、解的个数或第一个解
+    """
+    if mode == MODE_SOLUTIONS:
+        return set(engine.enumerate(month, day))
+    if mode == MODE_COUNTS:
+        return engine.count(month, day)
+    assert mode == MODE_SOLVE
+    return engine.solve(month, day)
+
+
+def check_reuse(name: str, targets: List[Tuple[int, int]], mode: str = MODE_COUNTS) -> List[str]:
+    """
+    同一个引擎依次求解所有目标，每个目标的结果都必须与新建的引擎相同（引擎内的缓存不能跨日期出错）
+    """
+    shared = create_engine(name)
+    problems = []
+    for month, day in targets:
+        a = engine_result(shared, month, day, mode)
+        b = engine_result(create_engine(name), month, day, mode)
+        if a != b:
+            problems.append("%02d-%02d: reused %s gave %s, a new one gave %s"
+                            % (month + 1, day + 1, name, len(a) if mode == MODE_SOLUTIONS else a,
+                               len(b) if mode == MODE_SOLUTIONS else b))
+    return problems
+
+
+def differential(first: str, second: str, targets: List[Tuple[int, int]], mode: str = MODE_SOLUTIONS) \
+        -> List[str]:
+    """
+    在所有目标（月份和日期从0开始）上对比两个引擎，返回所有不一致之处
+    """
+    a = create_engine(first)
+    b = create_engine(second)
+    problems = []
+    for month, day in targets:
+        for p in compare_date(a, b, month, day, mode):
+            problems.append("%02d-%02d: %s" % (month + 1, day + 1, p))
+    return problems
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Run two solver engines over all dates and check that they agree")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("--engines", nargs=2, default=[ENGINE_FIRST_BLANK, ENGINE_CONSTRAINED],
+                        choices=sorted(ENGINE_FACTORIES), help="the two engines to compare")
+    parser.add_argument("--mode", default=MODE_SOLUTIONS, choices=MODES,
+                        help="compare solution sets, counts, or first solutions")
+    parser.add_argument("--month", type=int, help="month, 1-12 (all 372 month/day targets when omitted)")
+    parser.add_argument("--day", type=int, help="day, 1-31")
+    parser.add_argument("--targets", nargs="+", metavar="MM-DD", help="explicit list of month/day targets")
+    parser.add_argument("--reuse", action="store_true",
+                        help="instead check that each engine, reused across the targets, matches a new engine")
+    options = parser.parse_args(args)
+    if options.config is not None:
+        use_config(options.config)
+
+    if options.targets is not None:
+        targets = [(int(t.split("-")[0]) - 1, int(t.split("-")[1]) - 1) for t in options.targets]
+    elif options.month is not None and options.day is not None:
+        targets = [(options.month - 1, options.day - 1)]
+    else:
+        targets = all_targets()
+    start_time = time.time()
+    try:
+        if options.reuse:
+            problems = []
+            for name in options.engines:
+                problems += check_reuse(name, targets, options.mode)
+        else:
+            problems = differential(options.engines[0], options.engines[1], targets, options.mode)
+    except NotImplementedError as e:
+        # 例如frontier_count只支持counts
+        parser.error("%s (try another --mode)" % e)
+    seconds = time.time() - start_time
+    for p in problems:
+        print(p)
+    print("%s %s %s (%s): %s targets, %s problems in %.3f seconds"
+          % (options.engines[0], "and" if options.reuse else "vs", options.engines[1],
+             options.mode + (", reused" if options.reuse else ""), len(targets), len(problems), seconds))
+    return 1 if len(problems) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
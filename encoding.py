@@ -0,0 +1,135 @@
+import hashlib
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+# 解的紧凑编码：每块积木一个字节，为该积木在放置表（bitboard.BRICK_PLACEMENTS）中的放置序号，按积木序号排列
+# 每块积木的放置方式都少于256种；同一种拼法不论积木放置的先后，编码都相同，可直接比较、去重和作为缓存键
+#
+# 批量文件格式（小端）：
+#   文件头：魔数(4) 版本(H) 积木数(H) 放置表摘要(20)
+#   解：每个解占 积木数 个字节
+SOLUTIONS_MAGIC = b"CPSL"
+SOLUTIONS_VERSION = 1
+SOLUTIONS_HEADER = struct.Struct("<4sHH20s")
+
+# 放置表摘要（首次使用时计算）
+__table_digest = None
+
+
+def table_digest() -> bytes:
+    """
+    放置表摘要：日历板或积木变化后放置序号的含义随之变化，旧的编码失效
+    """
+    global __table_digest
+    if __table_digest is None:
+        from bitboard import BRICK_PLACEMENTS
+
+        digest = hashlib.sha1()
+        for placements in BRICK_PLACEMENTS:
+            digest.update(struct.pack("<H", len(placements)))
+            for brick, anchor, mask in placements:
+                digest.update(mask.to_bytes(8, "little"))
+        __table_digest = digest.digest()
+    return __table_digest
+
+
+def encode_placements(placements: Tuple[int, ...]) -> bytes:
+    """
+    放置序号元组 -> 编码
+    """
+    return bytes(placements)
+
+
+def decode_placements(data: bytes) -> Tuple[int, ...]:
+    """
+    编码 -> 放置序号元组
+    """
+    return tuple(data)
+
+
+def encode(board) -> bytes:
+    """
+    已放满的Board或BitBoard -> 编码
+    """
+    from bitboard import from_board
+
+    return bytes(from_board(board))
+
+
+def decode(month: int, day: int, data: bytes):
+    """
+    编码 -> Board（用于绘制）
+    """
+    from bitboard import to_board
+
+    return to_board(month, day, tuple(data))
+
+
+def pack_solutions(solutions: Iterable[Tuple[int, ...]]) -> bytes:
+    """
+    把多个解（放置序号元组或编码）拼接为连续的字节串
+    """
+    return b"".join(bytes(s) for s in solutions)
+
+
+def unpack_solutions(data: bytes, brick_count: int) -> List[bytes]:
+    """
+    把连续的字节串拆分为编码列表
+    """
+    assert len(data) % brick_count == 0
+    return [data[k:k + brick_count] for k in range(0, len(data), brick_count)]
+
+
+def solutions_array(data: bytes, brick_count: int):
+    """
+    把连续的字节串转换为NumPy数组（解数 x 积木数，uint8），不复制数据
+    """
+    import numpy as np
+
+    return np.frombuffer(data, np.uint8).reshape(-1, brick_count)
+
+
+def unique_solutions(solutions: Iterable[Tuple[int, ...]]) -> List[bytes]:
+    """
+    去重并保持首次出现的顺序
+    """
+    seen = set()
+    result = []
+    for s in solutions:
+        data = bytes(s)
+        if data not in seen:
+            seen.add(data)
+            result.append(data)
+    return result
+
+
+def write_solutions(output: BinaryIO, solutions: Iterable[Tuple[int, ...]], brick_count: int) -> int:
+    """
+    批量写入解，返回写入的个数
+    """
+    output.write(SOLUTIONS_HEADER.pack(SOLUTIONS_MAGIC, SOLUTIONS_VERSION, brick_count, table_digest()))
+    count = 0
+    for s in solutions:
+        data = bytes(s)
+        assert len(data) == brick_count
+        output.write(data)
+        count += 1
+    return count
+
+
+def read_solutions(source: BinaryIO) -> Iterator[bytes]:
+    """
+    批量读取解（编码），放置表已变化时抛出ValueError
+    """
+    magic, version, brick_count, digest = SOLUTIONS_HEADER.unpack(source.read(SOLUTIONS_HEADER.size))
+    if magic != SOLUTIONS_MAGIC or version != SOLUTIONS_VERSION:
+        raise ValueError("Invalid solutions file")
+    if digest != table_digest():
+        raise ValueError("Solutions were written with a different placement table")
+    while True:
+        data = source.read(brick_count)
+        if len(data) == 0:
+            return
+        if len(data) != brick_count:
+            raise ValueError("Truncated solutions file")
+        yield data
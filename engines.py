@@ -0,0 +1,296 @@
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+from bitboard import *
+from cancel import CHECK_INTERVAL, RESULT_CANCELLED, CancelToken, SolveInterrupted
+from constrained import ConstrainedSearch
+from exact_cover import ExactCoverSolver
+from frontier_count import FrontierCounter
+from instrument import Instrument, SearchStats
+from portfolio import RandomizedSearch
+from transposition import TranspositionTable, state_key
+from vectorized import VectorSearch
+
+# 搜索引擎名称（solver中的多线程/多进程引擎也使用这些名称）
+ENGINE_GRID = "grid"
+ENGINE_BITBOARD = "bitboard"
+ENGINE_EXACT_COVER = "exact_cover"
+ENGINE_PROCESS_POOL = "process_pool"
+ENGINE_CONSTRAINED = "constrained"
+ENGINE_VECTORIZED = "vectorized"
+ENGINE_PORTFOLIO = "portfolio"
+# 只在引擎接口中使用：单进程的首格搜索、随机顺序搜索和记忆化计数
+ENGINE_FIRST_BLANK = "first_blank"
+ENGINE_RANDOMIZED = "randomized"
+ENGINE_FRONTIER_COUNT = "frontier_count"
+
+
+class Engine:
+    """
+    求解引擎接口：解一个日期、枚举或统计一个日期的所有解（月份和日期从0开始，解为放置序号元组）
+    搜索统计累计到stats；不支持的操作抛出NotImplementedError
+    """
+
+    name = None
+
+    def __init__(self):
+        self.stats = SearchStats()
+
+    def solve(self, month: int, day: int, token: CancelToken = None) -> Tuple[int, ...]:
+        """
+        第一个解，无解时返回None，token被取消或超时时抛出SolveInterrupted
+        """
+        raise NotImplementedError("%s cannot solve" % self.name)
+
+    def enumerate(self, month: int, day: int) -> Iterator[Tuple[int, ...]]:
+        """
+        逐个生成所有解，每种拼法只生成一次
+        """
+        raise NotImplementedError("%s cannot enumerate" % self.name)
+
+    def count(self, month: int, day: int) -> int:
+        """
+        解的个数
+        """
+        return sum(1 for s in self.enumerate(month, day))
+
+    def _collect(self, tries: int, prunes: List[int]):
+        self.stats.nodes += tries
+        self.stats.placements += tries
+        for i, n in enumerate(prunes):
+            self.stats.prunes[i] += n
+
+
+class GridEngine(Engine):
+    """
+    原有算法：逐个尝试积木顺序（BrickSeqFactory），按顺序把每块积木放在首个空格，置换表记录已无法继续的局面
+    多线程时每个线程一个引擎，共用置换表和停止信号；trace在每次放置后调用（用于Debug时逐步绘制）
+    """
+
+    def __init__(self, bitboard: bool = False, failed_states: TranspositionTable = None, token: CancelToken = None,
+                 stop_event: threading.Event = None, instrument: Instrument = None, slot: int = 0,
+                 trace: Callable[[Board], None] = None):
+        Engine.__init__(self)
+        self.name = ENGINE_BITBOARD if bitboard else ENGINE_GRID
+        self.failed_states = failed_states if failed_states is not None else TranspositionTable()
+        self.__bitboard = bitboard
+        self.__token = token
+        self.__stop_event = stop_event
+        self.__instrument = instrument if instrument is not None else Instrument()
+        self.__slot = slot
+        self.__trace = trace
+        # 当前日期的日期格和禁用格，加入局面键，使同一个置换表可以跨日期复用
+        self.__blocked = 0
+        # 下一次检查是否停止时的节点数
+        self.__next_check = CHECK_INTERVAL
+        # 下一次回调进度时的放置次数，不回调时为无穷大
+        self.__next_progress = self.__instrument.interval if self.__instrument.progress is not None \
+            else float("inf")
+
+    def new_board(self, month: int, day: int) -> Board:
+        board = BitBoard(month, day) if self.__bitboard else Board(month, day)
+        self.__blocked = blocked_mask(month, day)
+        self.stats.prunes = board.prunes
+        return board
+
+    def solve(self, month: int, day: int, token: CancelToken = None) -> Tuple[int, ...]:
+        if token is not None:
+            self.__token = token
+        board = self.new_board(month, day)
+        factory = BrickSeqFactory(BRICKS, -1)
+        while True:
+            bricks = factory.next()
+            if len(bricks) == 0:
+                # 已遍历完所有可能
+                return None
+            if self.place_bricks(board, bricks):
+                return from_board(board)
+
+    def enumerate(self, month: int, day: int) -> Iterator[Tuple[int, ...]]:
+        # 每种拼法按首格顺序只对应一种积木顺序，因此不会重复
+        board = self.new_board(month, day)
+        factory = BrickSeqFactory(BRICKS, -1)
+        while True:
+            bricks = factory.next()
+            if len(bricks) == 0:
+                return
+            yield from self.__iter(board, bricks, 0)
+
+    def __state_key(self, board: Board, bricks: List[Brick], idx: int) -> int:
+        """
+        下一块积木能否放入只取决于当前占用情况（含日期格）和剩余积木，与已放置积木的先后无关
+        """
+        remaining = 0
+        for b in bricks[idx:]:
+            remaining |= 1 << BRICK_NUMBERS[b]
+        return state_key(board.occupied | self.__blocked, remaining, BRICK_NUMBERS[bricks[idx]])
+
+    def __check_stop(self):
+        if self.stats.nodes >= self.__next_check:
+            self.__next_check += CHECK_INTERVAL
+            if self.__stop_event is not None and self.__stop_event.is_set() \
+                    or self.__token is not None and self.__token.is_set():
+                # 直接展开调用栈，不记录失败局面
+                raise SolveInterrupted(self.__token.reason if self.__token is not None else RESULT_CANCELLED)
+
+    def place_bricks(self, board: Board, bricks: List[Brick]) -> bool:
+        """
+        按给定顺序放入所有积木，成功时board为完整的解
+        """
+        return self.__place(board, bricks, 0)
+
+    def __place(self, board: Board, bricks: List[Brick], idx: int) -> bool:
+        stats = self.stats
+        stats.nodes += 1
+        if idx == len(bricks):
+            return True
+        self.__check_stop()
+
+        # 检查下一块积木是否已确定无法放入
+        key = self.__state_key(board, bricks, idx)
+        if key in self.failed_states:
+            stats.cache_hits += 1
+            return False
+
+        placed = False
+        for b in board.split_bricks(bricks[idx], False):
+            loc = board.find_location(b)
+            if loc is None:
+                continue
+
+            stats.placements += 1
+            if stats.placements >= self.__next_progress:
+                self.__next_progress += self.__instrument.interval
+                self.__instrument.progress(self.__slot, stats, time.time() - self.__instrument.start_time)
+
+            placed = True
+            board.place(loc, b)
+            if self.__trace is not None:
+                self.__trace(board)
+            if self.__place(board, bricks, idx + 1):
+                return True
+            board.unplace()
+            stats.backtracks += 1
+
+        if not placed:
+            # 新的失败局面
+            self.failed_states.add(key)
+
+        return False
+
+    def __iter(self, board: Board, bricks: List[Brick], idx: int) -> Iterator[Tuple[int, ...]]:
+        stats = self.stats
+        stats.nodes += 1
+        if idx == len(bricks):
+            yield from_board(board)
+            return
+
+        key = self.__state_key(board, bricks, idx)
+        if key in self.failed_states:
+            stats.cache_hits += 1
+            return
+
+        placed = False
+        for b in board.split_bricks(bricks[idx], False):
+            loc = board.find_location(b)
+            if loc is None:
+                continue
+            stats.placements += 1
+            placed = True
+            board.place(loc, b)
+            yield from self.__iter(board, bricks, idx + 1)
+            board.unplace()
+            stats.backtracks += 1
+
+        if not placed:
+            self.failed_states.add(key)
+
+
+class SearchEngine(Engine):
+    """
+    基于搜索类（BitSearch、ConstrainedSearch、VectorSearch或RandomizedSearch）的引擎
+    """
+
+    def __init__(self, name: str, search_class: type):
+        Engine.__init__(self)
+        self.name = name
+        self.__search_class = search_class
+
+    def solve(self, month: int, day: int, token: CancelToken = None) -> Tuple[int, ...]:
+        search = self.__search_class(token)
+        solution = []
+        found = search.solve(blocked_mask(month, day), ALL_BRICKS, solution)
+        self._collect(search.tries, search.prunes)
+        if search.cancelled:
+            raise SolveInterrupted(token.reason, 0.0, search.tries)
+        return compact(solution) if found else None
+
+    def enumerate(self, month: int, day: int) -> Iterator[Tuple[int, ...]]:
+        search = self.__search_class()
+        try:
+            yield from search.iter_solutions(blocked_mask(month, day), ALL_BRICKS)
+        finally:
+            self._collect(search.tries, search.prunes)
+
+    def count(self, month: int, day: int) -> int:
+        search = self.__search_class()
+        total = search.count(blocked_mask(month, day), ALL_BRICKS)
+        self._collect(search.tries, search.prunes)
+        return total
+
+
+class ExactCoverEngine(Engine):
+    """精确覆盖（Algorithm X）"""
+
+    name = ENGINE_EXACT_COVER
+
+    def solve(self, month: int, day: int, token: CancelToken = None) -> Tuple[int, ...]:
+        solver = ExactCoverSolver(month, day, token)
+        try:
+            return next(solver.iter_solutions(), None)
+        finally:
+            self._collect(solver.tries, [])
+
+    def enumerate(self, month: int, day: int) -> Iterator[Tuple[int, ...]]:
+        solver = ExactCoverSolver(month, day)
+        try:
+            yield from solver.iter_solutions()
+        finally:
+            self._collect(solver.tries, [])
+
+
+class FrontierCountEngine(Engine):
+    """记忆化计数，只支持count"""
+
+    name = ENGINE_FRONTIER_COUNT
+
+    def __init__(self):
+        Engine.__init__(self)
+        self.__counter = FrontierCounter()
+
+    def count(self, month: int, day: int) -> int:
+        # 首个空格之前的日期格与积木格无法区分，不同日期可以共用备忘表
+        total = self.__counter.count(month, day)
+        self.stats.nodes = self.__counter.misses
+        self.stats.cache_hits = self.__counter.hits
+        return total
+
+
+# 引擎名称 -> 创建引擎
+ENGINE_FACTORIES: Dict[str, Callable[[], Engine]] = {
+    ENGINE_GRID: lambda: GridEngine(),
+    ENGINE_BITBOARD: lambda: GridEngine(True),
+    ENGINE_EXACT_COVER: ExactCoverEngine,
+    ENGINE_FIRST_BLANK: lambda: SearchEngine(ENGINE_FIRST_BLANK, BitSearch),
+    ENGINE_CONSTRAINED: lambda: SearchEngine(ENGINE_CONSTRAINED, ConstrainedSearch),
+    ENGINE_VECTORIZED: lambda: SearchEngine(ENGINE_VECTORIZED, VectorSearch),
+    ENGINE_RANDOMIZED: lambda: SearchEngine(ENGINE_RANDOMIZED, RandomizedSearch),
+    ENGINE_FRONTIER_COUNT: FrontierCountEngine,
+}
+
+
+def create_engine(name: str) -> Engine:
+    factory = ENGINE_FACTORIES.get(name)
+    if factory is None:
+        raise ValueError("Unknown engine: %s" % name)
+    return factory()
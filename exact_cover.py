@@ -0,0 +1,110 @@
+from typing import Dict, Iterator, List, Set, Tuple
+from bitboard import *
+from cancel import CHECK_INTERVAL, CancelToken
+
+
+class ExactCoverSolver:
+    """
+    精确覆盖求解（Knuth's Algorithm X）
+    列：8块积木各一列，每个开放格各一列；行：每种合法的放置方式
+    @see https://en.wikipedia.org/wiki/Knuth%27s_Algorithm_X
+    """
+
+    def __init__(self, month: int, day: int, token: CancelToken = None):
+        self.__month = month
+        self.__day = day
+        self.__token = token
+        self.tries = 0
+        blocked = blocked_mask(month, day)
+
+        # 行：(积木序号, 放置序号) -> 覆盖的列
+        self.__rows: Dict[Tuple[int, int], List[int]] = {}
+        # 列：积木列为 BOARD_SIZE + 积木序号，格子列为格子序号
+        self.__columns: Dict[int, Set[Tuple[int, int]]] = {}
+        for i in range(len(BRICKS)):
+            self.__columns[BOARD_SIZE + i] = set()
+        for cell in range(BOARD_SIZE):
+            if not blocked >> cell & 1:
+                self.__columns[cell] = set()
+
+        for i, placements in enumerate(BRICK_PLACEMENTS):
+            for j, p in enumerate(placements):
+                mask = p[2]
+                if mask & blocked:
+                    continue
+                row = [BOARD_SIZE + i]
+                while mask:
+                    low = mask & -mask
+                    row.append(low.bit_length() - 1)
+                    mask ^= low
+                self.__rows[(i, j)] = row
+                for c in row:
+                    self.__columns[c].add((i, j))
+
+    def solve(self) -> Board:
+        """
+        求解，返回第一个解，无解时返回None
+        """
+        solution = []
+        if not self.__search(solution):
+            return None
+        return to_board(self.__month, self.__day, compact(solution))
+
+    def __search(self, solution: List[Tuple[int, int]]) -> bool:
+        if len(self.__columns) == 0:
+            return True
+
+        # 总是选择候选行最少的列（约束最强）
+        column = min(self.__columns, key=lambda c: len(self.__columns[c]))
+        for row in list(self.__columns[column]):
+            self.tries += 1
+            if self.__token is not None and self.tries % CHECK_INTERVAL == 0:
+                # 已取消或已超时则抛出SolveInterrupted
+                self.__token.check()
+            solution.append(row)
+            removed = self.__select(row)
+            if self.__search(solution):
+                return True
+            self.__deselect(row, removed)
+            solution.pop()
+        return False
+
+    def iter_solutions(self) -> Iterator[Tuple[int, ...]]:
+        """
+        逐个生成所有解（放置序号元组）
+        """
+        return self.__iter([])
+
+    def __iter(self, solution: List[Tuple[int, int]]) -> Iterator[Tuple[int, ...]]:
+        if len(self.__columns) == 0:
+            yield compact(solution)
+            return
+
+        column = min(self.__columns, key=lambda c: len(self.__columns[c]))
+        for row in list(self.__columns[column]):
+            self.tries += 1
+            if self.__token is not None and self.tries % CHECK_INTERVAL == 0:
+                self.__token.check()
+            solution.append(row)
+            removed = self.__select(row)
+            yield from self.__iter(solution)
+            self.__deselect(row, removed)
+            solution.pop()
+
+    def __select(self, row: Tuple[int, int]) -> List[Set[Tuple[int, int]]]:
+        removed = []
+        for c in self.__rows[row]:
+            for r in self.__columns[c]:
+                for other in self.__rows[r]:
+                    if other != c:
+                        self.__columns[other].remove(r)
+            removed.append(self.__columns.pop(c))
+        return removed
+
+    def __deselect(self, row: Tuple[int, int], removed: List[Set[Tuple[int, int]]]):
+        for c in reversed(self.__rows[row]):
+            self.__columns[c] = removed.pop()
+            for r in self.__columns[c]:
+                for other in self.__rows[r]:
+                    if other != c:
+                        self.__columns[other].add(r)
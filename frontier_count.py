@@ -0,0 +1,136 @@
+import argparse
+import sys
+import time
+from typing import Dict, List, Tuple
+from bitboard import *
+from single_pass import CELL_DAYS, CELL_MONTHS, DAY_MASK, HOLE_DAY, HOLE_MONTH, MONTH_MASK, SinglePassSearch
+
+# 备忘表默认容量（条目数）
+MEMO_CAPACITY = 1 << 20
+
+# 计数结果：(留出的月份, 留出的日期) -> 解的个数，在子问题中未留出的一项为-1
+Counts = Dict[Tuple[int, int], int]
+
+
+class FrontierCounter:
+    """
+    记忆化计数：按行优先顺序逐格覆盖首个空格（与BitSearch相同），首格之前的格子都已占用，
+    因此(占用掩码, 剩余积木, 尚未留出的格子)即为轮廓状态，不同积木顺序到达的相同状态只计算一次
+    统计单个日期时从该日期的占用掩码开始；统计所有日期时从整个日历板开始，与SinglePassSearch相同地留出月份格和日期格
+    备忘表有容量上限，超出时淘汰最早的条目
+    """
+
+    def __init__(self, capacity: int = MEMO_CAPACITY):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # 状态（占用掩码 | 剩余积木 << 49 | 尚未留出的格子 << 57） -> 计数结果
+        self.__memo: Dict[int, Counts] = {}
+        # 区域剪枝与一次枚举相同
+        self.__search = SinglePassSearch()
+
+    @property
+    def prunes(self) -> List[int]:
+        return self.__search.prunes
+
+    def count(self, month: int, day: int) -> int:
+        """
+        指定日期（从0开始）的解的个数
+        """
+        return self.__count(blocked_mask(month, day), ALL_BRICKS, 0).get((-1, -1), 0)
+
+    def count_all(self) -> Dict[Tuple[int, int], int]:
+        """
+        所有(月份, 日期)的解的个数（从0开始），包括没有解的日期
+        """
+        counts = {}
+        for month in range(len(TARGET_CELLS[TARGET_MONTH])):
+            for day in range(len(TARGET_CELLS[TARGET_DAY])):
+                counts[(month, day)] = 0
+        counts.update(self.__count(~OPEN_MASK & FULL_MASK, ALL_BRICKS, HOLE_MONTH | HOLE_DAY))
+        return counts
+
+    def __count(self, occupied: int, remaining: int, holes: int) -> Counts:
+        free = ~occupied & FULL_MASK
+        if free == 0:
+            return {(-1, -1): 1}
+        key = occupied | remaining << BOARD_SIZE | holes << (BOARD_SIZE + len(BRICKS))
+        result = self.__memo.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        result = {}
+        low = free & -free
+        cell = low.bit_length() - 1
+        rest = free ^ low
+        # 留作月份格或日期格：子问题的结果补上留出的月份或日期
+        if holes & HOLE_MONTH and low & MONTH_MASK and self.__search.check_zones(rest, remaining,
+                                                                                  holes & ~HOLE_MONTH):
+            month = CELL_MONTHS[cell]
+            for (m, d), n in self.__count(occupied | low, remaining, holes & ~HOLE_MONTH).items():
+                result[(month, d)] = result.get((month, d), 0) + n
+        if holes & HOLE_DAY and low & DAY_MASK and self.__search.check_zones(rest, remaining, holes & ~HOLE_DAY):
+            day = CELL_DAYS[cell]
+            for (m, d), n in self.__count(occupied | low, remaining, holes & ~HOLE_DAY).items():
+                result[(m, day)] = result.get((m, day), 0) + n
+        # 用剩余积木覆盖
+        for i in range(len(BRICKS)):
+            if not remaining >> i & 1:
+                continue
+            for j, mask in FIRST_CELL_PLACEMENTS[i][cell]:
+                if mask & occupied or not self.__search.check_zones(free & ~mask, remaining & ~(1 << i), holes):
+                    continue
+                for target, n in self.__count(occupied | mask, remaining & ~(1 << i), holes).items():
+                    result[target] = result.get(target, 0) + n
+
+        if len(self.__memo) >= self.capacity:
+            # 淘汰最早加入的条目
+            del self.__memo[next(iter(self.__memo))]
+            self.evictions += 1
+        self.__memo[key] = result
+        return result
+
+    def clear(self):
+        self.__memo.clear()
+
+    def memory(self) -> Dict[str, int]:
+        """
+        备忘表的条目数和估算占用的字节数（字典、键和计数结果）
+        """
+        size = sys.getsizeof(self.__memo)
+        for key, counts in self.__memo.items():
+            size += sys.getsizeof(key) + sys.getsizeof(counts)
+            for target, n in counts.items():
+                size += sys.getsizeof(target) + sys.getsizeof(n)
+        return {"entries": len(self.__memo), "bytes": size}
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Count solutions with a memoized frontier search")
+    parser.add_argument("--month", type=int, help="month, 1-12 (all dates when omitted)")
+    parser.add_argument("--day", type=int, help="day, 1-31")
+    parser.add_argument("--capacity", type=int, default=MEMO_CAPACITY, help="maximum memo entries")
+    options = parser.parse_args(args)
+
+    counter = FrontierCounter(options.capacity)
+    start_time = time.time()
+    if options.month is not None and options.day is not None:
+        print("%02d-%02d: %s solutions" % (options.month, options.day,
+                                           counter.count(options.month - 1, options.day - 1)))
+    else:
+        counts = counter.count_all()
+        for (month, day), n in sorted(counts.items()):
+            print("%02d-%02d: %s solutions" % (month + 1, day + 1, n))
+        print("%s solutions for %s dates" % (sum(counts.values()), len(counts)))
+    seconds = time.time() - start_time
+    memory = counter.memory()
+    print("%.3f seconds, memo: %s entries, %.1f MiB, %s hits, %s misses, %s evictions"
+          % (seconds, memory["entries"], memory["bytes"] / (1 << 20), counter.hits, counter.misses,
+             counter.evictions))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
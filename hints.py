@@ -0,0 +1,107 @@
+from typing import Dict, List, Tuple
+from bitboard import *
+from encoding import decode_placements, encode_placements
+from solution_db import DB_FILE, open_current
+
+
+class HintSolver:
+    """
+    残局提示：已放置部分积木时，判断能否完成、给出一种完成方式、统计完成方式的个数或提示下一步
+    每次查询只在该日期的所有解中筛选（约1毫秒以内）：有解库时从解库读出，否则首次查询该日期时枚举一次（约0.2秒）
+    """
+
+    def __init__(self, db_file: str = DB_FILE):
+        self.__db = open_current(db_file)
+        # 日期 -> 该日期的所有解（编码），从解库读出或枚举后缓存
+        self.__solutions: Dict[Tuple[int, int], List[bytes]] = {}
+
+    def close(self):
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
+
+    @staticmethod
+    def state(month: int, day: int, placed: List[Tuple[Grid, Brick]]) -> (int, int, Dict[int, int]):
+        """
+        校验已放置的积木[(左上角, 积木朝向)]（与Board.place的参数相同），返回(占用掩码, 剩余积木, {积木序号: 放置序号})
+        积木越界、与禁用格/日期格/其它积木重叠或重复放置时抛出ValueError
+        """
+        occupied = blocked_mask(month, day)
+        remaining = ALL_BRICKS
+        fixed = {}
+        for location, brick in placed:
+            number = PLACEMENT_NUMBERS.get((brick, location.y * BOARD_WIDTH + location.x))
+            if number is None:
+                raise ValueError("brick does not fit on the board at (%s, %s)" % (location.x, location.y))
+            i, j = number
+            if not remaining >> i & 1:
+                raise ValueError("brick %s is placed twice" % i)
+            mask = BRICK_PLACEMENTS[i][j][2]
+            if mask & occupied:
+                raise ValueError("brick %s at (%s, %s) overlaps a date or another brick" % (i, location.x, location.y))
+            occupied |= mask
+            remaining &= ~(1 << i)
+            fixed[i] = j
+        return occupied, remaining, fixed
+
+    def prepare(self, month: int, day: int) -> List[bytes]:
+        """
+        读出或枚举指定日期的所有解（编码），之后的查询不再搜索
+        """
+        solutions = self.__solutions.get((month, day))
+        if solutions is None:
+            if self.__db is not None:
+                solutions = self.__db.solutions(month, day)
+            else:
+                solutions = [encode_placements(s) for s in iter_solutions(month, day)]
+            self.__solutions[(month, day)] = solutions
+        return solutions
+
+    def __matching(self, month: int, day: int, placed: List[Tuple[Grid, Brick]]) -> List[bytes]:
+        """
+        与已放置积木一致的所有解
+        """
+        occupied, remaining, fixed = self.state(month, day, placed)
+        if remaining != 0 and not check_zones(~occupied & FULL_MASK, remaining):
+            # 与__try_place相同的区域剪枝，残局已有孤立的非法空白区域
+            return []
+        return [s for s in self.prepare(month, day) if all(s[i] == j for i, j in fixed.items())]
+
+    def complete(self, month: int, day: int, placed: List[Tuple[Grid, Brick]]) -> Tuple[int, ...]:
+        """
+        一种完成方式（放置序号元组，含已放置的积木），无法完成时返回None
+        """
+        matching = self.__matching(month, day, placed)
+        return decode_placements(matching[0]) if len(matching) > 0 else None
+
+    def solvable(self, month: int, day: int, placed: List[Tuple[Grid, Brick]]) -> bool:
+        """
+        是否还能完成
+        """
+        return self.complete(month, day, placed) is not None
+
+    def count(self, month: int, day: int, placed: List[Tuple[Grid, Brick]]) -> int:
+        """
+        完成方式的个数
+        """
+        return len(self.__matching(month, day, placed))
+
+    def next_move(self, month: int, day: int, placed: List[Tuple[Grid, Brick]]) -> Tuple[Grid, Brick]:
+        """
+        提示下一步：覆盖首个空格的积木[(左上角, 积木朝向)]，无法完成或已完成时返回None
+        """
+        occupied, remaining, fixed = self.state(month, day, placed)
+        if remaining == 0:
+            return None
+        placements = self.complete(month, day, placed)
+        if placements is None:
+            return None
+        free = ~occupied & FULL_MASK
+        first = free & -free
+        for i, j in enumerate(placements):
+            if i in fixed:
+                continue
+            brick, anchor, mask = BRICK_PLACEMENTS[i][j]
+            if mask & first:
+                return Grid(anchor % BOARD_WIDTH, anchor // BOARD_WIDTH), brick
+        return None
@@ -0,0 +1,176 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+from model import PRUNE_RULES, prune_stats
+
+# 剖析方式
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLING = "sampling"
+
+# 默认每隔多少次放置回调一次进度
+PROGRESS_INTERVAL = 10000
+
+# 采样间隔（秒）
+SAMPLING_INTERVAL = 0.001
+
+
+class SearchStats:
+    """搜索统计：每个工作线程各一份，结束时合并，避免多线程竞争"""
+
+    __slots__ = ("nodes", "placements", "backtracks", "cache_hits", "prunes")
+
+    def __init__(self):
+        # 访问的节点数
+        self.nodes = 0
+        # 放置积木次数（即原来的tries）
+        self.placements = 0
+        # 回溯次数
+        self.backtracks = 0
+        # 置换表命中次数
+        self.cache_hits = 0
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES
+        self.prunes = [0] * len(PRUNE_RULES)
+
+    def merge(self, other: "SearchStats"):
+        self.nodes += other.nodes
+        self.placements += other.placements
+        self.backtracks += other.backtracks
+        self.cache_hits += other.cache_hits
+        for i, n in enumerate(other.prunes):
+            self.prunes[i] += n
+
+    def as_dict(self) -> Dict:
+        return {
+            "nodes": self.nodes,
+            "placements": self.placements,
+            "backtracks": self.backtracks,
+            "cache_hits": self.cache_hits,
+            "prunes": prune_stats(self.prunes),
+        }
+
+
+class Profiler:
+    """
+    性能剖析
+    cprofile：每个搜索线程各自用cProfile剖析，结束后合并输出pstats文件
+    sampling：后台线程定时采集所有线程的调用栈，输出折叠栈文件（可用flamegraph.pl生成火焰图）
+    auto_dump为False时每次求解结束不输出，多次求解累计后由调用方调用dump
+    """
+
+    def __init__(self, mode: str = PROFILE_CPROFILE, output: str = None, auto_dump: bool = True):
+        assert mode in (PROFILE_CPROFILE, PROFILE_SAMPLING)
+        self.mode = mode
+        self.output = output
+        self.auto_dump = auto_dump
+        self.__lock = threading.Lock()
+        self.__profiles: List[cProfile.Profile] = []
+        self.__samples = Counter()
+        self.__sampler = None
+        self.__stopped = threading.Event()
+
+    def start(self):
+        if self.mode == PROFILE_SAMPLING:
+            self.__stopped.clear()
+            self.__sampler = threading.Thread(target=self.__sample, daemon=True)
+            self.__sampler.start()
+
+    def stop(self):
+        if self.mode == PROFILE_SAMPLING:
+            self.__stopped.set()
+            self.__sampler.join()
+        if self.auto_dump:
+            self.dump()
+
+    @contextmanager
+    def profile_thread(self):
+        """
+        在当前线程中剖析（仅cprofile模式有效）
+        """
+        if self.mode != PROFILE_CPROFILE:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self.__lock:
+                self.__profiles.append(profile)
+
+    def __sample(self):
+        me = threading.get_ident()
+        while not self.__stopped.wait(SAMPLING_INTERVAL):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("%s:%s" % (code.co_filename.rsplit("/", 1)[-1], code.co_name))
+                    frame = frame.f_back
+                self.__samples[";".join(reversed(stack))] += 1
+
+    def dump(self):
+        """
+        输出剖析结果：写入output文件，并在stderr打印耗时最多的函数
+        """
+        if self.mode == PROFILE_CPROFILE:
+            if len(self.__profiles) == 0:
+                return
+            stats = pstats.Stats(self.__profiles[0], stream=sys.stderr)
+            for p in self.__profiles[1:]:
+                stats.add(p)
+            if self.output is not None:
+                stats.dump_stats(self.output)
+            stats.sort_stats("tottime").print_stats(20)
+        else:
+            if self.output is not None:
+                with open(self.output, "w") as output:
+                    for stack, count in self.__samples.items():
+                        output.write("%s %s\n" % (stack, count))
+            # 按栈顶函数统计自身耗时
+            leaves = Counter()
+            for stack, count in self.__samples.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values())
+            buffer = io.StringIO()
+            buffer.write("%s samples\n" % total)
+            for name, count in leaves.most_common(20):
+                buffer.write("%6.2f%% %s\n" % (count * 100.0 / total, name))
+            sys.stderr.write(buffer.getvalue())
+
+
+class Instrument:
+    """搜索观测选项：进度回调、统计信息输出和性能剖析，均关闭时几乎没有额外开销"""
+
+    def __init__(self, progress: Callable[[int, SearchStats, float], None] = None,
+                 interval: int = PROGRESS_INTERVAL, profiler: Profiler = None, log: Callable[[str], None] = None):
+        # 进度回调：progress(工作线程序号, 该线程的统计, 已用秒数)
+        self.progress = progress
+        self.interval = interval
+        self.profiler = profiler
+        # 统计信息回调：log(一行说明)，如置换表的命中情况；为None时不输出
+        self.log = log
+        self.start_time = time.time()
+
+
+def print_progress(slot: int, stats: SearchStats, elapsed: float):
+    """
+    默认的进度回调：放置次数和速度输出到stderr（stdout留给结果）
+    """
+    print("[Worker-%s] %s: %s (%.0f/s)" % (slot, time.asctime(time.localtime(time.time())), stats.placements,
+                                          stats.placements / elapsed if elapsed > 0 else 0.0), file=sys.stderr)
+
+
+def print_log(line: str):
+    """
+    默认的统计信息回调：输出到stderr
+    """
+    print(line, file=sys.stderr)
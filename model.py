@@ -1,8 +1,14 @@
-from typing import List
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+import itertools
+import json
 import numpy as np
 import os
 from numpy import ndarray
-from tkinter import Canvas
+from config_select import CONFIG_ENV
+
+if TYPE_CHECKING:
+    # 仅用于类型标注，无界面模式下不加载tkinter
+    from tkinter import Canvas
 
 DOT_SIZE = 50
 
@@ -26,6 +32,75 @@ MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "", "Jul", "Aug", "Sep", "Oc
 # 月份所占行数
 MONTH_ROW_COUNT = 2
 
+# 程序所在目录，数据文件都相对于它，与当前工作目录无关
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 日历板布局文件：x为禁用格，其它字符为目标格的类别
+LAYOUT_FILE = os.path.join(PACKAGE_DIR, "calendar.data")
+FORBIDDEN_CHAR = "x"
+# 目标格类别
+TARGET_MONTH = "m"
+TARGET_DAY = "d"
+
+def load_layout(file: str) -> List[str]:
+    """
+    读取日历板布局，每行一个字符串
+    """
+    with open(file, "r") as data:
+        return [line.strip() for line in data if len(line.strip()) > 0]
+
+
+def target_cells(layout: List[str]) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    各类别的目标格[(x, y)]，按行优先排列，第k个即该类别取值为k时的格子
+    """
+    cells = {}
+    for y, row in enumerate(layout):
+        for x, c in enumerate(row):
+            if c != FORBIDDEN_CHAR:
+                cells.setdefault(c, []).append((x, y))
+    return cells
+
+
+def load_config(file: str) -> dict:
+    with open(file, "r") as data:
+        return json.load(data)
+
+
+# 当前使用的配置文件，为None时使用calendar.data和内置积木
+CONFIG_FILE = os.environ.get(CONFIG_ENV) or None
+CONFIG = load_config(CONFIG_FILE) if CONFIG_FILE is not None else None
+
+LAYOUT = [row.strip() for row in CONFIG["board"]] if CONFIG is not None else load_layout(LAYOUT_FILE)
+
+# 日历板尺寸，格子(x, y)对应掩码的第y * BOARD_WIDTH + x位
+BOARD_WIDTH = max(len(row) for row in LAYOUT)
+BOARD_HEIGHT = len(LAYOUT)
+
+# 目标格：类别 -> [(x, y)]
+TARGET_CELLS = target_cells(LAYOUT)
+
+# 格子标签：(x, y) -> 月份或日期（或配置中其它类别的标签）
+GRID_LABELS: Dict[Tuple[int, int], str] = {}
+if CONFIG is not None:
+    for category, labels in CONFIG.get("labels", {}).items():
+        GRID_LABELS.update(zip(TARGET_CELLS.get(category, []), labels))
+else:
+    GRID_LABELS.update(zip(TARGET_CELLS[TARGET_MONTH], [m for m in MONTHS if m != ""]))
+    GRID_LABELS.update(zip(TARGET_CELLS[TARGET_DAY], [str(d + 1) for d in range(len(TARGET_CELLS[TARGET_DAY]))]))
+
+# 第0列和最后一列的掩码，用于左右平移时防止跨行
+COLUMN_FIRST_MASK = sum(1 << (y * BOARD_WIDTH) for y in range(BOARD_HEIGHT))
+COLUMN_LAST_MASK = COLUMN_FIRST_MASK << (BOARD_WIDTH - 1)
+
+# 剪枝规则
+PRUNE_OVERLAP = 0
+PRUNE_ZONE_SIZE_1 = 1
+PRUNE_ZONE_SIZE_MOD_5 = 2
+PRUNE_ZONE_SHAPE_5 = 3
+PRUNE_ZONE_SHAPE_6 = 4
+PRUNE_RULES = ["overlap", "zone_size_1", "zone_size_mod_5", "zone_shape_5", "zone_shape_6"]
+
 
 class Grid:
     """坐标点"""
@@ -41,26 +116,59 @@ class Grid:
 
 
 class Brick:
-    """积木"""
+    """积木（不可变，按形状比较和哈希）"""
+
+    __slots__ = ("width", "height", "darray", "bidirection", "flippable", "key", "mask", "__hash", "__canonical",
+                 "__displacement")
 
     def __init__(self, width: int, height: int, darray: ndarray, bidirection: bool = False, flippable: bool = True):
-        self.width = width
-        self.height = height
-        self.darray = darray
-        self.bidirection = bidirection
-        self.flippable = flippable
+        darray = np.array(darray, int)
+        darray.flags.writeable = False
+        # 形状键：逐行的0/1元组，同一朝向的积木键相同
+        key = tuple(tuple(int(g) for g in row) for row in darray)
+        object.__setattr__(self, "width", width)
+        object.__setattr__(self, "height", height)
+        object.__setattr__(self, "darray", darray)
+        object.__setattr__(self, "bidirection", bidirection)
+        object.__setattr__(self, "flippable", flippable)
+        object.__setattr__(self, "key", key)
+        # 以(0, 0)为左上角放置时的掩码，平移y * BOARD_WIDTH + x位即得放置在(x, y)的掩码
+        object.__setattr__(self, "mask", sum(1 << (y * BOARD_WIDTH + x)
+                                             for y, row in enumerate(key) for x, g in enumerate(row) if g == 1))
+        object.__setattr__(self, "_Brick__hash", hash(key))
+        object.__setattr__(self, "_Brick__canonical", None)
+        object.__setattr__(self, "_Brick__displacement", key[0].index(1))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Brick is immutable")
+
+    def __reduce__(self):
+        # 不能逐个属性恢复（__setattr__已禁用），pickle和copy改为重新构造
+        return Brick, (self.width, self.height, self.darray, self.bidirection, self.flippable)
 
     def __eq__(self, other):
         if not isinstance(other, Brick):
             return False
-        return self.width == other.width and self.height == other.height and np.array_equal(self.darray, other.darray)
+        return self.__hash == other.__hash and self.key == other.key
 
     def __hash__(self):
-        return hash((self.darray.all()))
+        return self.__hash
 
     def __repr__(self):
         return self.darray.__repr__()
 
+    @property
+    def canonical(self) -> tuple:
+        """
+        规范形状：所有旋转和翻转中最小的形状键，形状相同的积木规范形状相同
+        """
+        if self.__canonical is None:
+            canonical = CANONICAL_KEYS.get(self.key)
+            if canonical is None:
+                canonical = min(transform_keys(self.key))
+            object.__setattr__(self, "_Brick__canonical", canonical)
+        return self.__canonical
+
     def rotate(self) -> "Brick":
         """
         逆时针旋转90°
@@ -80,70 +188,81 @@ class Brick:
         """
         计算首行第一个非空格移动到首行首格的左移格数
         """
-        for i in range(len(self.darray[0])):
-            if self.darray[0][i] == 1:
-                return i
+        return self.__displacement
+
+
+def transform_keys(key: tuple) -> List[tuple]:
+    """
+    形状键的8种变换（4种旋转，以及水平翻转后的4种旋转），顺序与Brick.rotate/flip一致
+    """
+    keys = []
+    for k in (key, tuple(tuple(reversed(row)) for row in key)):
+        for i in range(4):
+            keys.append(k)
+            # 逆时针旋转90°：新的第i行为原来的倒数第i列
+            k = tuple(zip(*k))[::-1]
+    return keys
+
+
+def calc_orientations(raw: Brick, flipped: bool = False) -> Tuple[Brick, ...]:
+    """
+    计算积木所有互不相同的朝向（旋转和翻转）
+    """
+    bricks = []
+    _raw = raw
+    for i in range(2 if raw.bidirection else 4):
+        if _raw not in bricks:
+            bricks.append(_raw)
+        _raw = _raw.rotate()
+    if raw.flippable and not flipped:
+        for b in calc_orientations(raw.flip(), True):
+            if b not in bricks:
+                bricks.append(b)
+    return tuple(bricks)
+
+
+def split_brick(raw: Brick, flipped: bool = False) -> Tuple[Brick, ...]:
+    """
+    拆分积木的所有朝向（旋转和翻转），预置积木直接查表
+    """
+    if not flipped:
+        orientations = ORIENTATIONS.get(raw)
+        if orientations is not None:
+            return orientations
+    return calc_orientations(raw, flipped)
+
 
 class BrickSeqFactory:
     "积木集合"
 
-    def __init__(self, bricks: List[Brick], slot: int = -1):
-        assert -1 <= slot < os.cpu_count()
+    def __init__(self, bricks: List[Brick], slot: int = -1, slots: int = None):
+        if slots is None:
+            slots = os.cpu_count()
+        assert -1 <= slot < slots
 
         self.__bricks = bricks
         self.__slot = slot
+        self.__slots = slots
         self.__seqs = self.__init_seqs(len(bricks))
-        self.__idx = 0
 
-    def __init_seqs(self, length) -> List[List[int]]:
+    def __init_seqs(self, length) -> Iterator[Tuple[int, ...]]:
         """
-        初始化全排列序列
+        按字典序逐个生成本槽位的全排列（第i个排列属于槽位i % slots），不预先生成：
+        8块积木就有40320个排列，预先生成会推迟各线程开始搜索和检查取消
         """
-        nums = []
-        for i in range(length):
-            nums.append(i)
-
-        full_seqs = self.__gen_seqs(nums)
+        seqs = itertools.permutations(range(length))
         if self.__slot == -1:
-            return full_seqs
-
-        seqs = []
-        for i, s in enumerate(full_seqs):
-            if i % os.cpu_count() == self.__slot:
-                seqs.append(s)
-        return seqs
-
-    def __gen_seqs(self, nums: List[int]) -> List[List[int]]:
-        """
-        生成全排列
-        @see itertools.permutations
-        """
-        # fn(1)=1
-        if len(nums) == 1:
-            return [[nums.pop()]]
-
-        seqs = []
-        for n in nums:
-            seq = [n]
-            nums2 = nums.copy()
-            nums2.remove(n)
-            for s in self.__gen_seqs(nums2):
-                # fn(N) = n + fn(N-1)
-                seqs.append(seq + s)
-        return seqs
+            return seqs
+        return itertools.islice(seqs, self.__slot, None, self.__slots)
 
     def next(self) -> List[Brick]:
         """
         返回下一个积木序列
         """
-        if self.__idx == len(self.__seqs):
+        seq = next(self.__seqs, None)
+        if seq is None:
             return []
-
-        seq = []
-        for i in self.__seqs[self.__idx]:
-            seq.append(self.__bricks[i])
-        self.__idx += 1
-        return seq
+        return [self.__bricks[i] for i in seq]
 
 
 # 积木常量
@@ -155,17 +274,131 @@ BRICK_4 = Brick(3, 3, np.array([[1, 0, 0], [1, 0, 0], [1, 1, 1]], int), False, F
 BRICK_5 = Brick(2, 4, np.array([[1, 1], [1, 0], [1, 0], [1, 0]], int), False, True)
 BRICK_6 = Brick(2, 4, np.array([[1, 0], [1, 1], [1, 0], [1, 0]], int), False, True)
 BRICK_7 = Brick(2, 4, np.array([[1, 0], [1, 1], [0, 1], [0, 1]], int), False, True)
-BRICKS = [BRICK_0, BRICK_1, BRICK_2, BRICK_3, BRICK_4, BRICK_5, BRICK_6, BRICK_7]
+BUILTIN_BRICKS = [BRICK_0, BRICK_1, BRICK_2, BRICK_3, BRICK_4, BRICK_5, BRICK_6, BRICK_7]
+
+
+def config_brick(piece: dict) -> Brick:
+    """
+    配置中的积木，如{"shape": ["11", "10", "11"], "flippable": true}；旋转180°后不变的积木只需两个旋转方向
+    """
+    key = tuple(tuple(int(g) for g in row) for row in piece["shape"])
+    return Brick(len(key[0]), len(key), np.array(key, int), transform_keys(key)[2] == key,
+                 piece.get("flippable", True))
+
+
+# 当前使用的积木
+BRICKS = [config_brick(p) for p in CONFIG["pieces"]] if CONFIG is not None else BUILTIN_BRICKS
+# 各积木的格数，以及最小的格数
+BRICK_SIZES = [b.mask.bit_count() for b in BRICKS]
+MIN_BRICK_SIZE = min(BRICK_SIZES)
+
+# 朝向表（导入时计算一次）：预置积木 -> 所有朝向
+ORIENTATIONS: Dict[Brick, Tuple[Brick, ...]] = {}
+# 规范形状表：预置积木任一朝向的形状键 -> 规范形状
+CANONICAL_KEYS: Dict[tuple, tuple] = {}
+# 积木序号表：预置积木任一朝向 -> 在BRICKS中的序号
+BRICK_NUMBERS: Dict[Brick, int] = {}
+# 区域形状表：积木在日历板任一位置的掩码 -> 积木集合（形状相同的积木可能有多块）
+ZONE_BRICKS: Dict[int, int] = {}
+# 剩余积木集合 -> 可以恰好拼出的格数（第k位为1表示可以拼出k格）
+FILLABLE_SIZES: Dict[int, int] = {0: 1}
+
+
+def __init_orientations():
+    for n, raw in enumerate(BRICKS):
+        ORIENTATIONS[raw] = calc_orientations(raw)
+        keys = transform_keys(raw.key)
+        canonical = min(keys)
+        for k in keys:
+            CANONICAL_KEYS[k] = canonical
+        for b in ORIENTATIONS[raw]:
+            BRICK_NUMBERS[b] = n
+            for y in range(BOARD_HEIGHT - b.height + 1):
+                for x in range(BOARD_WIDTH - b.width + 1):
+                    zone = b.mask << (y * BOARD_WIDTH + x)
+                    ZONE_BRICKS[zone] = ZONE_BRICKS.get(zone, 0) | (1 << n)
+
+
+__init_orientations()
+
+
+def fillable_sizes(remaining: int) -> int:
+    """
+    剩余积木的所有子集的格数（位集合）
+    """
+    sizes = FILLABLE_SIZES.get(remaining)
+    if sizes is None:
+        low = remaining & -remaining
+        rest = fillable_sizes(remaining ^ low)
+        sizes = rest | (rest << BRICK_SIZES[low.bit_length() - 1])
+        FILLABLE_SIZES[remaining] = sizes
+    return sizes
+
+
+def check_zones(free: int, remaining: int, prunes: List[int] = None) -> bool:
+    """
+    检查是否有孤立的非法空白区域，remaining为尚未放置的积木集合（每块积木1位）
+    区域格数必须能由剩余积木恰好拼出；小于最小积木格数两倍的区域只能放一块积木，形状必须相同
+    不合法时按剪枝规则计数（规则名称按内置积木的5格/6格命名）
+    """
+    sizes = FILLABLE_SIZES.get(remaining)
+    if sizes is None:
+        sizes = fillable_sizes(remaining)
+    while free:
+        # 泛洪出首个空格所在的区域
+        zone = free & -free
+        while True:
+            grown = (zone | ((zone << 1) & ~COLUMN_FIRST_MASK) | ((zone >> 1) & ~COLUMN_LAST_MASK)
+                     | (zone << BOARD_WIDTH) | (zone >> BOARD_WIDTH)) & free
+            if grown == zone:
+                break
+            zone = grown
+        free ^= zone
+
+        length = zone.bit_count()
+        rule = -1
+        if length < MIN_BRICK_SIZE:
+            rule = PRUNE_ZONE_SIZE_1
+        elif not sizes >> length & 1:
+            rule = PRUNE_ZONE_SIZE_MOD_5
+        elif length < 2 * MIN_BRICK_SIZE and not ZONE_BRICKS.get(zone, 0) & remaining:
+            # 只能放一块积木的空白区域必须恰好是某块剩余积木的形状
+            rule = PRUNE_ZONE_SHAPE_5 if length == MIN_BRICK_SIZE else PRUNE_ZONE_SHAPE_6
+        if rule >= 0:
+            if prunes is not None:
+                prunes[rule] += 1
+            return False
+    return True
+
+
+def prune_stats(prunes: List[int]) -> Dict[str, int]:
+    """
+    剪枝计数（按规则名称）
+    """
+    return dict(zip(PRUNE_RULES, prunes))
 
 
 class Board:
     """日历板"""
 
     def __init__(self, month: int, day: int):
-        self.__board = self.__init_board("calendar.data")
-        self.__board[int(month / 6)][month % 6] = Grid(month % 6, int(month / 6), False, GRID_STATUS_CALENDAR)
-        self.__board[int(day / 7) + 2][day % 7] = Grid(day % 7, int(day / 7) + 2, True, GRID_STATUS_CALENDAR)
+        self.__board = self.__init_board(LAYOUT)
+        x, y = TARGET_CELLS[TARGET_MONTH][month]
+        self.__board[y][x] = Grid(x, y, False, GRID_STATUS_CALENDAR)
+        x, y = TARGET_CELLS[TARGET_DAY][day]
+        self.__board[y][x] = Grid(x, y, True, GRID_STATUS_CALENDAR)
         self.__bricks = []
+        # 尚未放置的积木集合（每块积木1位）
+        self.__remaining = (1 << len(BRICKS)) - 1
+        # 空格掩码（不含日期格和禁用格）和积木占用掩码
+        self.__blank = 0
+        for row in self.__board:
+            for g in row:
+                if g.status == GRID_STATUS_BLANK:
+                    self.__blank |= 1 << (g.y * BOARD_WIDTH + g.x)
+        self.__occupied = 0
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES
+        self.prunes = [0] * len(PRUNE_RULES)
 
     def __repr__(self):
         result = ""
@@ -176,188 +409,61 @@ class Board:
             result += "\n"
         return result
 
-    def __init_board(self, file: str) -> List[List[Grid]]:
-        data = open(file, "r")
+    def __init_board(self, layout: List[str]) -> List[List[Grid]]:
         board = []
-        for i, line in enumerate(data):
+        for i, line in enumerate(layout):
             row = []
-            for j, c in enumerate(line.strip()):
-                status = GRID_STATUS_FORBIDDEN if c == "x" else GRID_STATUS_BLANK
+            for j, c in enumerate(line):
+                status = GRID_STATUS_FORBIDDEN if c == FORBIDDEN_CHAR else GRID_STATUS_BLANK
                 # status = DOT_STATUS_FORBIDDEN if c == "x" else DOT_STATUS_BRICK
                 # 行对应y，列对应x
                 row.append(Grid(j, i, i >= MONTH_ROW_COUNT, status))
             board.append(row)
         return board
 
-    def find_location(self, brick: Brick) -> Grid:
-        location = None
-        blanks = []
-        for row in self.__board:
-            for g in row:
-                if g.status == GRID_STATUS_BLANK:
-                    if location is None:
-                        # 只取第一个空格，保证积木严格按照预定顺序放入
-                        location = g
-                    blanks.append(g)
+    @property
+    def occupied(self) -> int:
+        return self.__occupied
+
+    @property
+    def bricks(self) -> List[Tuple[Grid, Brick]]:
+        """
+        已放置的积木[(左上角, 积木朝向)]
+        """
+        return self.__bricks
 
+    def find_location(self, brick: Brick) -> Grid:
+        # 只取第一个空格（最低的空闲位），保证积木严格按照预定顺序放入
+        free = self.__blank & ~self.__occupied
+        cell = (free & -free).bit_length() - 1
         # 根据积木形状移动放置点
-        displacement = brick.calc_left_displacement()
-        location = Grid(location.x - displacement, location.y)
-        if self.__try_place(location, brick, blanks):
+        location = Grid(cell % BOARD_WIDTH - brick.calc_left_displacement(), int(cell / BOARD_WIDTH))
+        if self.__try_place(location, brick, free):
             return location
         return None
 
-    def __try_place(self, location: Grid, brick: Brick, blanks: List[Grid]) -> bool:
+    def __try_place(self, location: Grid, brick: Brick, free: int) -> bool:
         # 检查是否越界
-        if location.x < 0 or (location.x + brick.width - 1) >= 7 or (location.y + brick.height - 1) >= 7:
+        if location.x < 0 or (location.x + brick.width - 1) >= BOARD_WIDTH \
+                or (location.y + brick.height - 1) >= BOARD_HEIGHT:
             return False
 
         # 检查是否都是空格
-        blanks = blanks.copy()
-        for y, row in enumerate(brick.darray):
-            for x, g in enumerate(row):
-                if g == 1:
-                    if self.__board[y + location.y][x + location.x].status != GRID_STATUS_BLANK:
-                        return False
-                    blanks.remove(self.__board[y + location.y][x + location.x])
+        mask = brick.mask << (location.y * BOARD_WIDTH + location.x)
+        if mask & ~free:
+            self.prunes[PRUNE_OVERLAP] += 1
+            return False
 
         # 检查是否有孤立的非法空白区域
-        for zone in self.__divide_zones(blanks):
-            length = len(zone)
-            if length % 5 > 1:
-                return False
-            if length == 1:
-                return False
-            if length == 6:
-                # 6格的合法空白区域只有BRICK_0一种
-                border = self.__calc_zone_board(zone)
-                width = border[0] - border[1] + 1
-                height = border[2] - border[3] + 1
-                if width * height != 6:
-                    return False
-                if width == 1 or width == 6:
-                    return False
-                if self.__is_eq(brick, BRICK_0) or self.__is_used(BRICK_0):
-                    return False
-            if length == 5:
-                border = self.__calc_zone_board(zone)
-                width = border[0] - border[1] + 1
-                if width == 1 or width == 5:
-                    return False
-                # 用空白区域构造一个伪积木，注意伪积木不能旋转和翻转
-                fake_brick = self.__build_fake_brick(zone)
-                if not self.__is_valid_brick(fake_brick):
-                    return False
-                if self.__is_eq(brick, fake_brick) or self.__is_used(fake_brick):
-                    return False
-        return True
-
-    def __build_fake_brick(self, zone: List[Grid]) -> Brick:
-        border = self.__calc_zone_board(zone)
-        width = border[0] - border[1] + 1
-        height = border[2] - border[3] + 1
-        grids = []
-        # 初始化（全置0）
-        for r in range(height):
-            row = []
-            grids.append(row)
-            for c in range(width):
-                row.append(0)
-        # 置1
-        for g in zone:
-            grids[g.y - border[3]][g.x - border[1]] = 1
-
-        return Brick(width, height, np.array(grids, int))
-
-    def __is_valid_brick(self, brick: Brick) -> bool:
-        for b1 in BRICKS:
-            for b2 in self.split_bricks(b1, False):
-                if brick == b2:
-                    return True
-        return False
-
-    def __is_eq(self, source: Brick, target: Brick) -> bool:
-        for b in self.split_bricks(source, False):
-            if b == target:
-                return True
-        return False
-
-    def __is_used(self, brick: Brick) -> bool:
-        for b in self.__bricks:
-            if self.__is_eq(b[1], brick):
-                return True
-        return False
-
-    def split_bricks(self, raw: Brick, flipped: bool) -> List[Brick]:
-        bricks = [raw]
-        if raw.bidirection:
-            bricks.append(raw.rotate())
-        else:
-            _raw = raw.rotate()
-            bricks.append(_raw)
-            _raw = _raw.rotate()
-            bricks.append(_raw)
-            _raw = _raw.rotate()
-            bricks.append(_raw)
+        return check_zones(free & ~mask, self.__remaining & ~(1 << BRICK_NUMBERS[brick]), self.prunes)
 
-        if raw.flippable and not flipped:
-            bricks = bricks + self.split_bricks(raw.flip(), not flipped)
-        return bricks
-
-    def __calc_zone_board(self, zone: List[Grid]) -> tuple:
-        # max取最小值，min取最大值，逐步收敛
-        max_x = 0
-        min_x = 6
-        max_y = 0
-        min_y = 6
-        for g in zone:
-            max_x = max(max_x, g.x)
-            min_x = min(min_x, g.x)
-            max_y = max(max_y, g.y)
-            min_y = min(min_y, g.y)
-        return max_x, min_x, max_y, min_y
-
-    def __divide_zones(self, blanks: List[Grid]) -> List[List[Grid]]:
-        zones = []
-        while len(blanks) > 0:
-            # 新建一个空白区域
-            head = blanks.pop(0)
-            queue = [head]
-            zone = []
-            zones.append(zone)
-            while len(queue) > 0:
-                grid = queue.pop(0)
-                zone.append(grid)
-
-                right = (grid.y <= 1 and grid.x == 5) or (grid.y > 1 and grid.x == 6)
-                if not right:
-                    right_neighbour = self.__board[grid.y][grid.x + 1]
-                bottom = (grid.x <= 2 and grid.y == 6) or (grid.x > 2 and grid.y == 5)
-                if not bottom:
-                    bottom_neighbour = self.__board[grid.y + 1][grid.x]
-                left = grid.x == 0
-                if not left:
-                    left_neighbour = self.__board[grid.y][grid.x - 1]
-                top = (grid.x <= 5 and grid.y == 0) or (grid.x == 6 and grid.y == 2)
-                if not top:
-                    top_neighbour = self.__board[grid.y - 1][grid.x]
-
-                if not right and right_neighbour in blanks:
-                    self.__move(right_neighbour, blanks, queue)
-                if not bottom and bottom_neighbour in blanks:
-                    self.__move(bottom_neighbour, blanks, queue)
-                if not left and left_neighbour in blanks:
-                    self.__move(left_neighbour, blanks, queue)
-                if not top and top_neighbour in blanks:
-                    self.__move(top_neighbour, blanks, queue)
-        return zones
-
-    def __move(self, grid: Grid, source: List[Grid], target: List[Grid]):
-        source.remove(grid)
-        target.append(grid)
+    def split_bricks(self, raw: Brick, flipped: bool) -> Tuple[Brick, ...]:
+        return split_brick(raw, flipped)
 
     def place(self, location: Grid, brick: Brick):
         self.__bricks.append((location, brick))
+        self.__remaining &= ~(1 << BRICK_NUMBERS[brick])
+        self.__occupied |= brick.mask << (location.y * BOARD_WIDTH + location.x)
         # 填充积木格
         for y, row in enumerate(brick.darray):
             for x, g in enumerate(row):
@@ -369,6 +475,8 @@ class Board:
         lb = self.__bricks.pop()
         location = lb[0]
         brick = lb[1]
+        self.__remaining |= 1 << BRICK_NUMBERS[brick]
+        self.__occupied &= ~(brick.mask << (location.y * BOARD_WIDTH + location.x))
         # 恢复空格
         for y, row in enumerate(brick.darray):
             for x, g in enumerate(row):
@@ -379,19 +487,12 @@ class Board:
     def __replace_grid(self, grid: Grid):
         self.__board[grid.y][grid.x] = grid
 
-    def draw(self, canvas: Canvas):
+    def draw(self, canvas: "Canvas"):
         # 画底板
         for row in self.__board:
             for g in row:
                 # 标签
-                if not g.is_day:
-                    label = MONTHS[g.y * 7 + g.x]
-                else:
-                    label = (g.y - 2) * 7 + g.x + 1
-                    if label > 31:
-                        label = ""
-                    else:
-                        label = str(label)
+                label = GRID_LABELS.get((g.x, g.y), "")
                 # 背景色
                 if g.status == GRID_STATUS_BLANK:
                     color = COLOR_BLANK
@@ -410,36 +511,46 @@ class Board:
         for b in self.__bricks:
             self.__draw_brick(canvas, b[0], b[1])
 
-    def __draw_brick(self, canvas: Canvas, location: Grid, brick: Brick):
-        # 计算外廓（相对坐标）
-        lines = []
-        for y, row in enumerate(brick.darray):
-            for x, g in enumerate(row):
-                if g == 0:
-                    # 空格
-                    continue
-                if x == 0 or brick.darray[y][x - 1] == 0:
-                    # 添加左边
-                    lines.append((Grid(x * DOT_SIZE, y * DOT_SIZE), Grid(x * DOT_SIZE, (y + 1) * DOT_SIZE)))
-
-                if x == brick.width - 1 or brick.darray[y][x + 1] == 0:
-                    # 添加右边
-                    lines.append((Grid((x + 1) * DOT_SIZE, y * DOT_SIZE), Grid((x + 1) * DOT_SIZE, (y + 1) * DOT_SIZE)))
-
-                if y == 0 or brick.darray[y - 1][x] == 0:
-                    # 添加上边
-                    lines.append((Grid(x * DOT_SIZE, y * DOT_SIZE), Grid((x + 1) * DOT_SIZE, y * DOT_SIZE)))
-
-                if y == brick.height - 1 or brick.darray[y + 1][x] == 0:
-                    # 添加下边
-                    lines.append((Grid(x * DOT_SIZE, (y + 1) * DOT_SIZE), Grid((x + 1) * DOT_SIZE, (y + 1) * DOT_SIZE)))
-
-        for l in lines:
-            # 平移外廓（绝对坐标）
-            start = Grid(l[0].x + location.x * DOT_SIZE, l[0].y + location.y * DOT_SIZE)
-            end = Grid(l[1].x + location.x * DOT_SIZE, l[1].y + location.y * DOT_SIZE)
-            # 画线
-            canvas.create_line(start.x, start.y, end.x, end.y, fill="black")
+    def __draw_brick(self, canvas: "Canvas", location: Grid, brick: Brick):
+        for x0, y0, x1, y1 in brick_outline(brick):
+            # 平移外廓（绝对坐标）并画线
+            canvas.create_line((x0 + location.x) * DOT_SIZE, (y0 + location.y) * DOT_SIZE,
+                               (x1 + location.x) * DOT_SIZE, (y1 + location.y) * DOT_SIZE, fill="black")
+
+
+# 外廓表：积木朝向 -> 外廓线段
+OUTLINES: Dict[Brick, Tuple[Tuple[int, int, int, int], ...]] = {}
+
+
+def brick_outline(brick: Brick) -> Tuple[Tuple[int, int, int, int], ...]:
+    """
+    积木外廓线段[(x0, y0, x1, y1)]（以格为单位的相对坐标），每个朝向只计算一次
+    """
+    lines = OUTLINES.get(brick)
+    if lines is not None:
+        return lines
+    lines = []
+    key = brick.key
+    for y, row in enumerate(key):
+        for x, g in enumerate(row):
+            if g == 0:
+                # 空格
+                continue
+            if x == 0 or row[x - 1] == 0:
+                # 添加左边
+                lines.append((x, y, x, y + 1))
+            if x == brick.width - 1 or row[x + 1] == 0:
+                # 添加右边
+                lines.append((x + 1, y, x + 1, y + 1))
+            if y == 0 or key[y - 1][x] == 0:
+                # 添加上边
+                lines.append((x, y, x + 1, y))
+            if y == brick.height - 1 or key[y + 1][x] == 0:
+                # 添加下边
+                lines.append((x, y + 1, x + 1, y + 1))
+    lines = tuple(lines)
+    OUTLINES[brick] = lines
+    return lines
 
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import time
+from typing import Callable, List, Tuple
+from bitboard import *
+from cancel import CancelToken, SolveInterrupted
+from instrument import Instrument
+
+# 默认在第几层拆分搜索树
+SPLIT_DEPTH = 2
+
+# 工作进程内的取消信号和搜索类（由进程池初始化）
+__cancel_event = None
+__search_class = BitSearch
+
+
+def split_tasks(occupied: int, remaining: int, depth: int, search_class: type = BitSearch) \
+        -> List[Tuple[int, int, List[Tuple[int, int]]]]:
+    """
+    在指定深度拆分搜索树，返回子树任务[(占用掩码, 剩余积木, 已放置列表)]，顺序与深度优先一致
+    search_class为BitSearch或接口相同的搜索类（如ConstrainedSearch）
+    """
+    tasks = []
+    search = search_class()
+
+    def expand(occupied: int, remaining: int, prefix: List[Tuple[int, int]]):
+        if len(prefix) == depth or remaining == 0:
+            tasks.append((occupied, remaining, prefix))
+            return
+        for i, j, mask in search.candidates(occupied, remaining):
+            expand(occupied | mask, remaining & ~(1 << i), prefix + [(i, j)])
+
+    expand(occupied, remaining, [])
+    return tasks
+
+
+def __init_worker(cancel_event, search_class: type):
+    global __cancel_event
+    global __search_class
+    __cancel_event = cancel_event
+    __search_class = search_class
+
+
+def __solve_task(task: Tuple[int, int, List[Tuple[int, int]]]) -> (List[Tuple[int, int]], int, List[int]):
+    """
+    在工作进程中搜索一棵子树，返回(解或None, 步数, 剪枝次数)
+    """
+    occupied, remaining, prefix = task
+    if __cancel_event.is_set():
+        return None, 0, [0] * len(PRUNE_RULES)
+    search = __search_class(__cancel_event)
+    solution = list(prefix)
+    if search.solve(occupied, remaining, solution):
+        # 找到一个解，通知其它进程停止
+        __cancel_event.set()
+        return solution, search.tries, search.prunes
+    return None, search.tries, search.prunes
+
+
+# 等待子任务结果时检查取消令牌的间隔（秒）
+POLL_INTERVAL = 0.005
+
+# 工作进程内运行子任务的函数，以及各子任务的开始和结束时间（由run_pool初始化）
+__task_function = None
+__task_times = None
+
+
+def __init_pool(task_function: Callable, task_times, initializer: Callable, initargs: tuple):
+    global __task_function
+    global __task_times
+    __task_function = task_function
+    __task_times = task_times
+    initializer(*initargs)
+
+
+def __run_task(item: Tuple[int, object]) -> (int, tuple):
+    """
+    在工作进程中运行第k个子任务，返回(k, 结果)
+    开始和结束时间写入共享数组，找到解后终止进程池时仍可统计各子任务已搜索的时间
+    """
+    k, task = item
+    __task_times[2 * k] = time.time()
+    result = __task_function(task)
+    __task_times[2 * k + 1] = time.time()
+    return k, result
+
+
+def busy_seconds(task_times, now: float) -> float:
+    """
+    各子任务的累计搜索时间：已结束的子任务为结束时间 - 开始时间，仍在运行的为now - 开始时间
+    """
+    total = 0.0
+    for k in range(len(task_times) // 2):
+        start, end = task_times[2 * k], task_times[2 * k + 1]
+        if start > 0:
+            total += (end if end > 0 else now) - start
+    return total
+
+
+def run_pool(tasks: list, task_function: Callable, processes: int, initializer: Callable, initargs: tuple = (),
+             token: CancelToken = None, start_time: float = None) -> (tuple, int, List[int], float):
+    """
+    在进程池中运行子任务，直到某个子任务找到解或全部完成，找到解后终止所有进程
+    进程池用initializer(cancel_event, *initargs)初始化工作进程，子任务找到解时应设置cancel_event通知其它进程停止
+    task_function(task)在工作进程中运行，返回(解或None, 步数, 剪枝次数, ...)
+    返回(找到解的子任务结果或None, 累计步数, 累计剪枝次数, 各子任务的累计搜索时间)，
+    搜索时间包括找到解时仍在运行、随后被终止的子任务
+    token被取消或超时时终止所有进程并抛出SolveInterrupted（start_time用于计算已用时间）
+    """
+    if start_time is None:
+        start_time = time.time()
+    cancel_event = multiprocessing.Event()
+    # 第k个子任务的开始和结束时间在第2k和2k + 1项，0为尚未开始或尚未结束；每项只由一个进程写入，不需要锁
+    task_times = multiprocessing.Array("d", 2 * len(tasks), lock=False)
+    tries = 0
+    prunes = [0] * len(PRUNE_RULES)
+    with multiprocessing.Pool(processes, __init_pool,
+                              (task_function, task_times, initializer, (cancel_event,) + initargs)) as pool:
+        # chunksize=1：每个进程做完一个子任务再领取下一个，自然实现负载均衡
+        results = pool.imap_unordered(__run_task, enumerate(tasks), 1)
+        for n in range(len(tasks)):
+            while True:
+                try:
+                    k, result = results.next(POLL_INTERVAL)
+                    break
+                except multiprocessing.TimeoutError:
+                    if token is not None and token.is_set():
+                        pool.terminate()
+                        raise SolveInterrupted(token.reason, time.time() - start_time, tries)
+            tries += result[1]
+            for i, count in enumerate(result[2]):
+                prunes[i] += count
+            if result[0] is not None:
+                busy_time = busy_seconds(task_times, time.time())
+                pool.terminate()
+                return result, tries, prunes, busy_time
+    return None, tries, prunes, busy_seconds(task_times, time.time())
+
+
+def process_main(month: int, day: int, processes: int = None, depth: int = SPLIT_DEPTH, token: CancelToken = None,
+                 search_class: type = BitSearch, instrument: Instrument = None) \
+        -> (float, int, Tuple[int, ...], List[int], float):
+    """
+    多进程解谜：按深度拆分子树，空闲进程从共享队列领取剩余子树，第一个解取消其它进程
+    返回(耗时, 各进程累计步数, 紧凑谜底, 剪枝次数, 加速比)，无解时返回None
+    加速比为各子树的累计搜索时间 / 实际耗时（含拆分子树和启动进程），即相对于在一个进程中依次搜索这些子树
+    token被取消或超时时终止所有进程并抛出SolveInterrupted；instrument.log输出进程池的统计
+    """
+    if processes is None:
+        processes = os.cpu_count()
+
+    start_time = time.time()
+    tasks = split_tasks(blocked_mask(month, day), ALL_BRICKS, depth, search_class)
+    result, tries, prunes, busy_time = run_pool(tasks, __solve_task, processes, __init_worker, (search_class,),
+                                                token, start_time)
+    elapsed = time.time() - start_time
+    speedup = busy_time / elapsed if elapsed > 0 else 0.0
+    if instrument is not None and instrument.log is not None:
+        instrument.log("[ProcessPool] %s tasks, %s processes, speedup %.2fx (busy %.3fs, wall %.3fs)"
+                       % (len(tasks), processes, speedup, busy_time, elapsed))
+    if result is None:
+        return None
+    return elapsed, tries, compact(result[0]), prunes, speedup
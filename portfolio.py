@@ -0,0 +1,148 @@
+import os
+import random
+import time
+from typing import List, Tuple
+from bitboard import *
+from cancel import CancelToken, SolveInterrupted
+from instrument import Instrument
+from parallel import run_pool
+
+# 默认随机种子，同一种子的搜索顺序、步数和解都相同
+PORTFOLIO_SEED = 0
+# 重启计划的基本步数：第k次运行最多搜索 luby(k) * RESTART_BASE 步
+RESTART_BASE = 512
+
+# 工作进程内的取消信号（由进程池初始化）
+__cancel_event = None
+
+
+def luby(k: int) -> int:
+    """
+    Luby重启序列的第k项（从1开始）：1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    """
+    power = 1
+    while (1 << power) - 1 < k:
+        power += 1
+    while (1 << power) - 1 != k:
+        k -= (1 << (power - 1)) - 1
+        power = 1
+        while (1 << power) - 1 < k:
+            power += 1
+    return 1 << (power - 1)
+
+
+class RandomizedSearch(BitSearch):
+    """
+    随机顺序的首格搜索：每层的候选放置方式按种子打乱，超出重启计划的步数后换一种顺序从头搜索
+    重启步数按Luby序列增长，最终总能搜完整棵树；种子相同时结果可重现
+    """
+
+    def __init__(self, cancel_event=None, seed: int = PORTFOLIO_SEED, restart_base: int = RESTART_BASE):
+        BitSearch.__init__(self, cancel_event)
+        self.seed = seed
+        self.restarts = 0
+        self.__random = random.Random(seed)
+        self.__restart_base = restart_base
+        self.__cancel_event = cancel_event
+        # 本次运行的步数上限，以及是否因达到上限而中止
+        self.__limit = 0
+        self.__exhausted = False
+
+    def candidates(self, occupied: int, remaining: int) -> List[Tuple[int, int, int]]:
+        result = BitSearch.candidates(self, occupied, remaining)
+        self.__random.shuffle(result)
+        return result
+
+    def solve(self, occupied: int, remaining: int, solution: List[Tuple[int, int]]) -> bool:
+        """
+        按重启计划搜索一个解，找到时solution为完整的放置列表
+        """
+        prefix = len(solution)
+        while True:
+            self.__limit = self.tries + luby(self.restarts + 1) * self.__restart_base
+            self.__exhausted = False
+            if self.__solve(occupied, remaining, solution):
+                return True
+            if self.cancelled or not self.__exhausted:
+                # 已取消，或者整棵树都已搜完
+                return False
+            self.restarts += 1
+            del solution[prefix:]
+
+    def __solve(self, occupied: int, remaining: int, solution: List[Tuple[int, int]]) -> bool:
+        if remaining == 0:
+            return True
+        for i, j, mask in self.candidates(occupied, remaining):
+            self.tries += 1
+            if self.tries % self.CHECK_INTERVAL == 0 and self.__cancel_event is not None \
+                    and self.__cancel_event.is_set():
+                self.cancelled = True
+            if self.tries >= self.__limit:
+                self.__exhausted = True
+            if self.cancelled or self.__exhausted:
+                return False
+            solution.append((i, j))
+            if self.__solve(occupied | mask, remaining & ~(1 << i), solution):
+                return True
+            solution.pop()
+        return False
+
+
+def __init_worker(cancel_event):
+    global __cancel_event
+    __cancel_event = cancel_event
+
+
+def __solve_seed(task: Tuple[int, int, int]) -> (List[Tuple[int, int]], int, List[int], int):
+    """
+    在工作进程中用一个种子搜索，返回(解或None, 步数, 剪枝次数, 种子)
+    """
+    occupied, remaining, seed = task
+    if __cancel_event.is_set():
+        return None, 0, [0] * len(PRUNE_RULES), seed
+    search = RandomizedSearch(__cancel_event, seed)
+    solution = []
+    if search.solve(occupied, remaining, solution):
+        # 找到一个解，通知其它进程停止
+        __cancel_event.set()
+        return solution, search.tries, search.prunes, seed
+    return None, search.tries, search.prunes, seed
+
+
+def portfolio_main(month: int, day: int, processes: int = None, seed: int = PORTFOLIO_SEED,
+                   token: CancelToken = None, instrument: Instrument = None) \
+        -> (float, int, Tuple[int, ...], List[int], int, float):
+    """
+    组合解谜：每个进程用不同的种子（seed, seed + 1, ...）随机顺序搜索，返回最先找到的解
+    返回(耗时, 各进程累计步数, 紧凑谜底, 剪枝次数, 找到解的种子, 加速比)，无解时返回None
+    加速比为各种子的累计搜索时间 / 实际耗时（见parallel.process_main）
+    只有一个进程时直接在当前进程搜索；token被取消或超时时抛出SolveInterrupted；instrument.log输出找到解的种子
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    log = instrument.log if instrument is not None else None
+
+    start_time = time.time()
+    occupied = blocked_mask(month, day)
+    if processes == 1:
+        search = RandomizedSearch(token, seed)
+        solution = []
+        found = search.solve(occupied, ALL_BRICKS, solution)
+        if search.cancelled:
+            raise SolveInterrupted(token.reason, time.time() - start_time, search.tries)
+        if log is not None:
+            log("[Portfolio] seed %s, %s restarts" % (seed, search.restarts))
+        if not found:
+            return None
+        return time.time() - start_time, search.tries, compact(solution), search.prunes, seed, 1.0
+
+    tasks = [(occupied, ALL_BRICKS, seed + k) for k in range(processes)]
+    result, tries, prunes, busy_time = run_pool(tasks, __solve_seed, processes, __init_worker, (), token, start_time)
+    elapsed = time.time() - start_time
+    speedup = busy_time / elapsed if elapsed > 0 else 0.0
+    if log is not None:
+        log("[Portfolio] %s seeds, first solution from seed %s, speedup %.2fx"
+            % (processes, result[3] if result is not None else None, speedup))
+    if result is None:
+        return None
+    return elapsed, tries, compact(result[0]), prunes, result[3], speedup
@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import config_select
+
+if __name__ == '__main__':
+    # 在导入model之前按命令行的--config选择配置
+    config_select.select_config()
+
+from typing import Dict, Iterator, List, Tuple
+from model import *
+
+# 配置文件格式（JSON）：
+#   name：名称
+#   board：日历板布局，每行一个字符串，x为禁用格，其它字符为目标格的类别
+#   targets：目标类别，按解谜时给出取值的顺序，如["m", "d"]或["m", "d", "w"]
+#   labels：可选，各类别的格子标签（按行优先顺序）
+#   pieces：积木列表，每块为{"shape": ["11", "10", "11"], "flippable": true}，1为积木格
+
+# 配置的规模上限：掩码放进uint64（vectorized、encoding），剩余积木集合占局面键的16位（transposition.state_key），
+# 每块积木的放置序号用一个字节编码（encoding、solution_db）
+MAX_BOARD_SIZE = 64
+MAX_PIECES = 16
+MAX_PLACEMENTS = 256
+
+def default_config() -> dict:
+    """
+    内置配置：calendar.data和内置积木
+    """
+    board = load_layout(LAYOUT_FILE)
+    return {
+        "name": "calendar",
+        "board": board,
+        "targets": [TARGET_MONTH, TARGET_DAY],
+        "labels": {TARGET_MONTH: [m for m in MONTHS if m != ""],
+                   TARGET_DAY: [str(d + 1) for d in range(len(target_cells(board)[TARGET_DAY]))]},
+        "pieces": [{"shape": ["".join(str(g) for g in row) for row in b.key], "flippable": b.flippable}
+                   for b in BUILTIN_BRICKS],
+    }
+
+
+def current_config() -> dict:
+    """
+    当前使用的配置：环境变量PUZZLE_CONFIG指定的配置文件，未指定时为内置配置
+    """
+    return CONFIG if CONFIG is not None else default_config()
+
+
+def config_digest(config: dict) -> bytes:
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).digest()
+
+
+class Puzzle:
+    """
+    编译后的配置：日历板掩码和每块积木的放置表，格子(x, y)对应掩码的第y * width + x位
+    bitboard按当前配置的Puzzle建立搜索用的各种表
+    """
+
+    def __init__(self, config: dict):
+        self.name = config.get("name", "")
+        board = [row.strip() for row in config["board"]]
+        self.width = max(len(row) for row in board)
+        self.height = len(board)
+        self.size = self.width * self.height
+        if self.size > MAX_BOARD_SIZE:
+            raise ValueError("board is %sx%s; at most %s cells are supported" % (self.width, self.height,
+                                                                                MAX_BOARD_SIZE))
+        self.full_mask = (1 << self.size) - 1
+
+        self.open_mask = 0
+        # 目标格：类别 -> [格子序号]
+        self.target_cells: Dict[str, List[int]] = {}
+        for y, row in enumerate(board):
+            for x, c in enumerate(row):
+                if c == FORBIDDEN_CHAR:
+                    continue
+                self.open_mask |= 1 << (y * self.width + x)
+                self.target_cells.setdefault(c, []).append(y * self.width + x)
+        self.targets: List[str] = list(config["targets"])
+        for t in self.targets:
+            if t not in self.target_cells:
+                raise ValueError("target %r does not appear on the board" % t)
+        self.labels: Dict[str, List[str]] = config.get("labels", {})
+
+        # 积木的形状键
+        self.pieces: List[tuple] = [tuple(tuple(int(g) for g in row) for row in p["shape"])
+                                    for p in config["pieces"]]
+        if len(self.pieces) > MAX_PIECES:
+            raise ValueError("%s pieces; at most %s are supported" % (len(self.pieces), MAX_PIECES))
+        self.all_pieces = (1 << len(self.pieces)) - 1
+        # 搜索代码按形状查积木序号（model.BRICK_NUMBERS、bitboard.PLACEMENT_NUMBERS），不支持形状相同的积木
+        shapes = {}
+        for n, key in enumerate(self.pieces):
+            canonical = min(transform_keys(key))
+            if canonical in shapes:
+                raise ValueError("pieces %s and %s have the same shape" % (shapes[canonical] + 1, n + 1))
+            shapes[canonical] = n
+        # 解谜时的空格数必须恰好等于积木总格数
+        cells = sum(sum(sum(row) for row in key) for key in self.pieces)
+        if cells != self.open_mask.bit_count() - len(self.targets):
+            raise ValueError("pieces cover %s cells but the board leaves %s" % (
+                cells, self.open_mask.bit_count() - len(self.targets)))
+
+        # 每块积木的所有放置方式：积木序号 -> [(朝向形状键, 左上角格, 掩码)]
+        self.placements: List[List[Tuple[tuple, int, int]]] = []
+        # 按首格索引的放置方式：积木序号 -> 首格 -> [(放置序号, 掩码)]
+        self.first_cell_placements: List[List[List[Tuple[int, int]]]] = []
+        for key, p in zip(self.pieces, config["pieces"]):
+            placements = []
+            by_first_cell = [[] for i in range(self.size)]
+            for k in self.__orientations(key, p.get("flippable", True)):
+                origin = sum(1 << (y * self.width + x) for y, row in enumerate(k) for x, g in enumerate(row) if g)
+                for y in range(self.height - len(k) + 1):
+                    for x in range(self.width - len(k[0]) + 1):
+                        mask = origin << (y * self.width + x)
+                        if mask & ~self.open_mask:
+                            continue
+                        by_first_cell[(mask & -mask).bit_length() - 1].append((len(placements), mask))
+                        placements.append((k, y * self.width + x, mask))
+            if len(placements) > MAX_PLACEMENTS:
+                raise ValueError("piece %s has %s placements; at most %s are supported" % (
+                    len(self.placements) + 1, len(placements), MAX_PLACEMENTS))
+            self.placements.append(placements)
+            self.first_cell_placements.append(by_first_cell)
+
+    @staticmethod
+    def __orientations(key: tuple, flippable: bool) -> List[tuple]:
+        """
+        所有互不相同的朝向，顺序与model.calc_orientations相同
+        """
+        keys = []
+        # transform_keys的前4个为旋转，后4个为翻转后的旋转
+        for k in transform_keys(key)[:8 if flippable else 4]:
+            if k not in keys:
+                keys.append(k)
+        return keys
+
+    def blocked_mask(self, values: Tuple[int, ...]) -> int:
+        """
+        初始占用掩码：禁用格和目标格均视为已占用，values为各目标类别的取值（从0开始）
+        """
+        assert len(values) == len(self.targets)
+        blocked = ~self.open_mask & self.full_mask
+        for t, v in zip(self.targets, values):
+            blocked |= 1 << self.target_cells[t][v]
+        return blocked
+
+    def all_values(self) -> Iterator[Tuple[int, ...]]:
+        """
+        所有目标取值组合
+        """
+        def values(k: int) -> Iterator[Tuple[int, ...]]:
+            if k == len(self.targets):
+                yield ()
+                return
+            for v in range(len(self.target_cells[self.targets[k]])):
+                for rest in values(k + 1):
+                    yield (v,) + rest
+
+        return values(0)
+
+
+def compile_puzzle(config: dict = None) -> Puzzle:
+    """
+    编译配置（默认为当前配置）；当前配置由bitboard在导入时编译一次（bitboard.PUZZLE），搜索代码都使用它
+    """
+    return Puzzle(config if config is not None else current_config())
+
+
+def compile_file(file: str) -> Puzzle:
+    return compile_puzzle(load_config(file))
+
+
+def use_config(file: str, dates_only: bool = True):
+    """
+    命令行入口的--config：各模块的预计算表在导入时按环境变量PUZZLE_CONFIG建立，入口脚本在导入搜索代码之前
+    用config_select.select_config设置它，这里只检查该配置就是本进程正在使用的配置
+    dates_only为True时只接受目标为月份和日期的配置（其它配置只能用本模块解谜）
+    """
+    config = load_config(file)
+    if config_digest(config) != config_digest(current_config()):
+        raise ValueError("config %s is not the active config; set %s=%s before importing the solver modules"
+                         % (file, CONFIG_ENV, os.path.abspath(file)))
+    if dates_only and config["targets"] != [TARGET_MONTH, TARGET_DAY]:
+        raise SystemExit("error: %s has targets %s; only puzzle_config.py solves targets other than month and day"
+                         % (file, config["targets"]))
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Solve a calendar puzzle described by a config file")
+    parser.add_argument("--config", help="JSON config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("values", nargs="*", type=int, help="one value per target, 1-based (e.g. month day)")
+    parser.add_argument("--count", action="store_true", help="count all solutions")
+    parser.add_argument("--check", action="store_true", help="check that every target combination is solvable")
+    options = parser.parse_args(args)
+
+    if options.config is not None:
+        use_config(options.config, False)
+    # 搜索代码按当前配置建立放置表
+    from bitboard import PUZZLE, count_solutions, iter_solutions
+    from cli import render_layout
+
+    puzzle = PUZZLE
+    print("%s: %sx%s, %s pieces, %s placements" % (puzzle.name, puzzle.width, puzzle.height, len(puzzle.pieces),
+                                                  sum(len(p) for p in puzzle.placements)))
+    if options.check:
+        unsolvable = [tuple(v + 1 for v in values) for values in puzzle.all_values()
+                      if next(iter_solutions(*values), None) is None]
+        print("unsolvable: %s" % unsolvable)
+        return 1 if len(unsolvable) > 0 else 0
+
+    if len(options.values) != len(puzzle.targets):
+        parser.error("expected %s values for targets %s" % (len(puzzle.targets), puzzle.targets))
+    values = tuple(v - 1 for v in options.values)
+    for t, v in zip(puzzle.targets, values):
+        if not 0 <= v < len(puzzle.target_cells[t]):
+            parser.error("target %r must be 1-%s" % (t, len(puzzle.target_cells[t])))
+    if options.count:
+        print(count_solutions(*values))
+        return 0
+    placements = next(iter_solutions(*values), None)
+    if placements is None:
+        print("no solution")
+        return 1
+    print("\n".join(render_layout(values[0], values[1], placements, *values[2:])))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
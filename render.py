@@ -0,0 +1,210 @@
+import argparse
+import io
+import os
+import sys
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import config_select
+
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
+
+from bitboard import *
+from solution_db import SolutionDB, open_current
+from puzzle_config import use_config
+
+try:
+    # Pillow可选，没有时只能输出SVG
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+    ImageDraw = None
+
+# 输出格式
+FORMAT_SVG = "svg"
+FORMAT_PNG = "png"
+FORMATS = [FORMAT_SVG, FORMAT_PNG]
+
+# 渲染结果缓存容量（全年366天每种格式各一张）
+RENDER_CACHE_CAPACITY = 1024
+
+# 渲染结果缓存：(格式, 月份, 日期, 放置序号元组) -> 图片内容
+RENDER_CACHE: Dict[Tuple[str, int, int, Tuple[int, ...]], bytes] = OrderedDict()
+
+# 与Board.draw相同的颜色（PNG用RGB）
+PNG_COLORS = {
+    COLOR_BLANK: (255, 255, 255),
+    COLOR_CALENDAR: (255, 255, 0),
+    COLOR_BRICK: (255, 192, 203),
+    COLOR_FORBIDDEN: (128, 128, 128),
+}
+
+
+def cell_colors(month: int, day: int, placements: Tuple[int, ...]) -> List[Tuple[int, int, str, str]]:
+    """
+    每个格子的[(x, y, 背景色, 标签)]，与Board.draw一致
+    """
+    bricks = 0
+    for i, j in enumerate(placements):
+        bricks |= BRICK_PLACEMENTS[i][j][2]
+    targets = blocked_mask(month, day) & OPEN_MASK
+    cells = []
+    for y in range(BOARD_HEIGHT):
+        for x in range(BOARD_WIDTH):
+            bit = cell_bit(x, y)
+            if bricks & bit:
+                color = COLOR_BRICK
+            elif targets & bit:
+                color = COLOR_CALENDAR
+            elif OPEN_MASK & bit:
+                color = COLOR_BLANK
+            else:
+                color = COLOR_FORBIDDEN
+            cells.append((x, y, color, GRID_LABELS.get((x, y), "")))
+    return cells
+
+
+def outline_segments(placements: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+    """
+    所有积木的外廓线段（以格为单位的绝对坐标），外廓按朝向缓存
+    """
+    segments = []
+    for i, j in enumerate(placements):
+        brick, anchor, mask = BRICK_PLACEMENTS[i][j]
+        ax = anchor % BOARD_WIDTH
+        ay = anchor // BOARD_WIDTH
+        for x0, y0, x1, y1 in brick_outline(brick):
+            segments.append((x0 + ax, y0 + ay, x1 + ax, y1 + ay))
+    return segments
+
+
+def render_svg(month: int, day: int, placements: Tuple[int, ...], size: int = DOT_SIZE) -> bytes:
+    """
+    渲染为SVG（月份和日期从0开始）
+    """
+    width = BOARD_WIDTH * size
+    height = BOARD_HEIGHT * size
+    out = io.StringIO()
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" width="%s" height="%s" viewBox="0 0 %s %s">\n'
+              % (width, height, width, height))
+    for x, y, color, label in cell_colors(month, day, placements):
+        out.write('<rect x="%s" y="%s" width="%s" height="%s" fill="%s"/>\n' % (x * size, y * size, size, size,
+                                                                              color))
+        if label != "":
+            out.write('<text x="%s" y="%s" font-family="sans-serif" font-size="%s" text-anchor="middle" '
+                      'dominant-baseline="central">%s</text>\n' % (x * size + size // 2, y * size + size // 2,
+                                                                  size * 3 // 10, label))
+    out.write('<path d="')
+    out.write(" ".join("M%s %sL%s %s" % (x0 * size, y0 * size, x1 * size, y1 * size)
+                       for x0, y0, x1, y1 in outline_segments(placements)))
+    out.write('" stroke="black" stroke-width="1" fill="none"/>\n')
+    out.write("</svg>\n")
+    return out.getvalue().encode()
+
+
+def render_png(month: int, day: int, placements: Tuple[int, ...], size: int = DOT_SIZE) -> bytes:
+    """
+    渲染为PNG（月份和日期从0开始），需要Pillow
+    """
+    if Image is None:
+        raise RuntimeError("PNG output requires Pillow (pip install Pillow)")
+    image = Image.new("RGB", (BOARD_WIDTH * size, BOARD_HEIGHT * size))
+    draw = ImageDraw.Draw(image)
+    for x, y, color, label in cell_colors(month, day, placements):
+        draw.rectangle((x * size, y * size, (x + 1) * size - 1, (y + 1) * size - 1), fill=PNG_COLORS[color])
+        if label != "":
+            draw.text((x * size + size // 2, y * size + size // 2), label, fill=(0, 0, 0), anchor="mm")
+    for x0, y0, x1, y1 in outline_segments(placements):
+        draw.line((x0 * size, y0 * size, x1 * size, y1 * size), fill=(0, 0, 0))
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+def render(month: int, day: int, placements: Tuple[int, ...], image_format: str = FORMAT_SVG) -> bytes:
+    """
+    渲染谜底（月份和日期从0开始），相同的谜底只渲染一次
+    """
+    key = (image_format, month, day, tuple(placements))
+    data = RENDER_CACHE.get(key)
+    if data is not None:
+        RENDER_CACHE.move_to_end(key)
+        return data
+    if image_format == FORMAT_PNG:
+        data = render_png(month, day, placements)
+    else:
+        assert image_format == FORMAT_SVG
+        data = render_svg(month, day, placements)
+    RENDER_CACHE[key] = data
+    while len(RENDER_CACHE) > RENDER_CACHE_CAPACITY:
+        RENDER_CACHE.popitem(False)
+    return data
+
+
+def find_solution(month: int, day: int, db: SolutionDB = None) -> Tuple[int, ...]:
+    """
+    指定日期的第一个解（月份和日期从0开始）：db为已打开的解库（见solution_db.open_current），为None时现场搜索
+    """
+    if db is not None:
+        return db.get(month, day)
+    from constrained import ConstrainedSearch
+
+    solution = []
+    if not ConstrainedSearch().solve(blocked_mask(month, day), ALL_BRICKS, solution):
+        return None
+    return compact(solution)
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Render calendar puzzle solutions to SVG/PNG without a display")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("--month", type=int, help="month, 1-12")
+    parser.add_argument("--day", type=int, help="day, 1-31")
+    parser.add_argument("--all", action="store_true", help="render all 366 dates and an index.html")
+    parser.add_argument("--format", default=FORMAT_SVG, choices=FORMATS)
+    parser.add_argument("--output", default=".", help="output directory")
+    options = parser.parse_args(args)
+    if options.config is not None:
+        use_config(options.config)
+
+    if options.format == FORMAT_PNG and Image is None:
+        parser.error("PNG output requires Pillow (pip install Pillow)")
+    if options.all:
+        from solver import all_dates
+        dates = all_dates()
+    elif options.month is not None and options.day is not None:
+        dates = [(options.month, options.day)]
+    else:
+        parser.error("either --month/--day or --all is required")
+
+    os.makedirs(options.output, exist_ok=True)
+    names = []
+    # 解库只打开一次，所有日期共用
+    db = open_current()
+    try:
+        for month, day in dates:
+            placements = find_solution(month - 1, day - 1, db)
+            if placements is None:
+                print("%02d-%02d: no solution" % (month, day), file=sys.stderr)
+                continue
+            name = "%02d-%02d.%s" % (month, day, options.format)
+            with open(os.path.join(options.output, name), "wb") as output:
+                output.write(render(month - 1, day - 1, placements, options.format))
+            names.append(name)
+    finally:
+        if db is not None:
+            db.close()
+    if options.all:
+        with open(os.path.join(options.output, "index.html"), "w") as index:
+            index.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Calendar Puzzle</title></head>"
+                        "<body>\n")
+            for name in names:
+                index.write('<figure style="display:inline-block"><img src="%s" alt="%s"><figcaption>%s'
+                            '</figcaption></figure>\n' % (name, name[:5], name[:5]))
+            index.write("</body></html>\n")
+    print("%s images written to %s" % (len(names), options.output))
+
+
+if __name__ == '__main__':
+    main()
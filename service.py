@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import config_select
+
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
+
+from bitboard import *
+from cli import render_layout
+from adaptive import SINGLE_PROCESS_ENGINES, StatsStore, solve_placements
+from solver import ENGINE_EXACT_COVER
+from puzzle_config import use_config
+
+# 默认Unix socket路径
+DEFAULT_SOCKET = "/tmp/calendar-puzzle.sock"
+
+# 结果缓存容量（日期数，全年366天可以全部缓存）
+CACHE_CAPACITY = 512
+# 同时在进程池中求解的请求数上限，默认为CPU核数
+MAX_RUNNING = os.cpu_count()
+# 等待求解的请求数上限，超过时直接拒绝
+MAX_PENDING = 1024
+# 统计延迟时保留最近多少个请求
+LATENCY_WINDOW = 1000
+
+
+def solve_date(month: int, day: int, engine: str = ENGINE_EXACT_COVER) -> (Tuple[int, ...], int):
+    """
+    在进程池中用单进程引擎解一个日期（月份和日期从0开始），返回紧凑谜底和步数
+    """
+    return solve_placements(month, day, engine)
+
+
+class SolveService:
+    """
+    本地解谜服务：每行一个JSON请求，每行一个JSON响应
+    {"month": 1, "day": 1} 解谜（月份和日期从1开始）
+    {"cmd": "stats"} 查询队列和延迟统计
+    请求中的id原样放入响应，用于匹配同一连接上乱序返回的响应
+    相同日期的并发请求合并为一次求解，结果进入LRU缓存
+    stats_store不为None时按其中的统计为每个日期选择单进程引擎，并记录每次求解
+    """
+
+    def __init__(self, processes: int = None, max_running: int = MAX_RUNNING, max_pending: int = MAX_PENDING,
+                 cache_capacity: int = CACHE_CAPACITY, stats_store: StatsStore = None):
+        # 用forkserver启动求解进程，避免子进程继承客户端连接导致连接无法关闭
+        self.__executor = ProcessPoolExecutor(processes, multiprocessing.get_context("forkserver"))
+        self.__max_pending = max_pending
+        self.__cache_capacity = cache_capacity
+        # 日期 -> 结果
+        self.__cache: Dict[Tuple[int, int], dict] = OrderedDict()
+        # 日期 -> 正在求解的Future
+        self.__inflight: Dict[Tuple[int, int], asyncio.Future] = {}
+        self.__semaphore = None
+        self.__max_running = max_running
+        self.__latencies = deque(maxlen=LATENCY_WINDOW)
+        self.__stats_store = stats_store
+        self.pending = 0
+        self.running = 0
+        self.requests = 0
+        self.solves = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def solve(self, month: int, day: int) -> dict:
+        """
+        解一个日期（月份和日期从1开始），优先使用缓存和正在进行的求解
+        """
+        key = (month, day)
+        result = self.__cache.get(key)
+        if result is not None:
+            self.__cache.move_to_end(key)
+            self.cache_hits += 1
+            return dict(result, cached=True)
+
+        future = self.__inflight.get(key)
+        if future is not None:
+            # 合并到正在进行的求解
+            self.coalesced += 1
+            return dict(await asyncio.shield(future), cached=False)
+
+        if self.pending + self.running >= self.__max_pending:
+            self.rejected += 1
+            return {"month": month, "day": day, "error": "busy"}
+
+        future = asyncio.get_running_loop().create_future()
+        self.__inflight[key] = future
+        try:
+            result = await self.__run(month, day)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其它等待者时避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        finally:
+            del self.__inflight[key]
+
+        self.__cache[key] = result
+        while len(self.__cache) > self.__cache_capacity:
+            self.__cache.popitem(False)
+        return dict(result, cached=False)
+
+    async def __run(self, month: int, day: int) -> dict:
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__max_running)
+        self.pending += 1
+        try:
+            await self.__semaphore.acquire()
+        finally:
+            self.pending -= 1
+        self.running += 1
+        engine = ENGINE_EXACT_COVER
+        if self.__stats_store is not None:
+            engine = self.__stats_store.choose(month - 1, day - 1, [(e, 1) for e in SINGLE_PROCESS_ENGINES])[0]
+        start_time = time.time()
+        try:
+            placements, tries = await asyncio.get_running_loop().run_in_executor(
+                self.__executor, solve_date, month - 1, day - 1, engine)
+        finally:
+            self.running -= 1
+            self.__semaphore.release()
+        seconds = time.time() - start_time
+        self.solves += 1
+        if self.__stats_store is not None:
+            self.__stats_store.record(month - 1, day - 1, engine, 1, seconds, tries, placements is not None)
+            self.__stats_store.flush()
+        result = {"month": month, "day": day, "found": placements is not None, "seconds": seconds,
+                  "tries": tries, "engine": engine}
+        if placements is not None:
+            result["placements"] = list(placements)
+            result["layout"] = render_layout(month - 1, day - 1, placements)
+        return result
+
+    def stats(self) -> dict:
+        """
+        队列深度、缓存和延迟统计（延迟为最近LATENCY_WINDOW个请求）
+        """
+        latencies = sorted(self.__latencies)
+        n = len(latencies)
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "inflight": len(self.__inflight),
+            "requests": self.requests,
+            "solves": self.solves,
+            "cache_size": len(self.__cache),
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "latency_mean": sum(latencies) / n if n > 0 else 0.0,
+            "latency_p50": latencies[n // 2] if n > 0 else 0.0,
+            "latency_p99": latencies[min(n - 1, n * 99 // 100)] if n > 0 else 0.0,
+            "latency_max": latencies[-1] if n > 0 else 0.0,
+        }
+
+    async def handle(self, request: dict) -> dict:
+        """
+        处理一个请求
+        """
+        response = await self.__handle(request)
+        if isinstance(request, dict) and "id" in request:
+            response = dict(response, id=request["id"])
+        return response
+
+    async def __handle(self, request: dict) -> dict:
+        if not isinstance(request, dict):
+            self.errors += 1
+            return {"error": "bad request: not an object"}
+        if request.get("cmd") == "stats":
+            return self.stats()
+        self.requests += 1
+        start_time = time.time()
+        try:
+            month = int(request["month"])
+            day = int(request["day"])
+            if not 1 <= month <= 12 or not 1 <= day <= 31:
+                raise ValueError("invalid date %s-%s" % (month, day))
+            response = await self.solve(month, day)
+        except (KeyError, TypeError, ValueError) as e:
+            self.errors += 1
+            return {"error": "bad request: %s" % e}
+        self.__latencies.append(time.time() - start_time)
+        return response
+
+    async def __serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        lock = asyncio.Lock()
+
+        async def reply(line: bytes):
+            request = None
+            try:
+                request = json.loads(line)
+                response = await self.handle(request)
+            except json.JSONDecodeError as e:
+                self.errors += 1
+                response = {"error": "bad request: %s" % e}
+            except Exception as e:
+                # 求解失败（如求解进程异常退出）也要回复，否则客户端会一直等待
+                self.errors += 1
+                response = {"error": "%s: %s" % (type(e).__name__, e)}
+                if isinstance(request, dict) and "id" in request:
+                    response["id"] = request["id"]
+            async with lock:
+                try:
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    await writer.drain()
+                except ConnectionError:
+                    # 客户端已断开
+                    pass
+
+        # 同一连接上的请求并发处理，响应按完成顺序返回
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                if len(line.strip()) == 0:
+                    continue
+                task = asyncio.ensure_future(reply(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if len(tasks) > 0:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str = DEFAULT_SOCKET, host: str = None, port: int = None):
+        """
+        在Unix socket（默认）或本机TCP端口上提供服务
+        """
+        if port is not None:
+            server = await asyncio.start_server(self.__serve_client, host or "127.0.0.1", port)
+        else:
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self.__serve_client, path)
+        print("[Service] Listening on %s" % (path if port is None else "%s:%s" % (host or "127.0.0.1", port)))
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.__executor.shutdown(cancel_futures=True)
+        if self.__stats_store is not None:
+            self.__stats_store.flush(True)
+
+
+def query(requests: List[dict], path: str = DEFAULT_SOCKET, host: str = None, port: int = None) -> List[dict]:
+    """
+    同步客户端：发送一批请求，按请求顺序返回响应（供其它进程调用）
+    """
+    if port is not None:
+        connection = socket.create_connection((host or "127.0.0.1", port))
+    else:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    with connection:
+        connection.sendall(b"".join(json.dumps(dict(request, id=i)).encode() + b"\n"
+                                    for i, request in enumerate(requests)))
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile("rb") as stream:
+            responses = [json.loads(line) for line in stream]
+    # 响应按完成顺序返回，这里按id还原为请求顺序
+    responses.sort(key=lambda r: r.get("id", len(requests)))
+    for response in responses:
+        response.pop("id", None)
+    return responses
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Calendar puzzle solve service")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--host", help="TCP host (default 127.0.0.1 when --port is given)")
+    parser.add_argument("--port", type=int, help="listen on TCP instead of the Unix socket")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="solver processes")
+    parser.add_argument("--max-running", type=int, default=MAX_RUNNING, help="concurrent solves")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING, help="queued solves before rejecting")
+    parser.add_argument("--cache", type=int, default=CACHE_CAPACITY, help="cached dates")
+    parser.add_argument("--stats", help="per-date engine statistics file; pick the fastest recorded engine")
+    options = parser.parse_args(args)
+    if options.config is not None:
+        use_config(options.config)
+
+    service = SolveService(options.processes, options.max_running, options.max_pending, options.cache,
+                           StatsStore(options.stats) if options.stats is not None else None)
+    try:
+        asyncio.run(service.serve(options.socket, options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+from bitboard import *
+
+# 月份格和日期格的掩码（配置中没有月份或日期时为0）
+MONTH_MASK = sum(cell_bit(x, y) for x, y in TARGET_CELLS.get(TARGET_MONTH, []))
+DAY_MASK = sum(cell_bit(x, y) for x, y in TARGET_CELLS.get(TARGET_DAY, []))
+# 格子序号 -> 月份或日期（从0开始）
+CELL_MONTHS: Dict[int, int] = {y * BOARD_WIDTH + x: m for m, (x, y) in enumerate(TARGET_CELLS.get(TARGET_MONTH, []))}
+CELL_DAYS: Dict[int, int] = {y * BOARD_WIDTH + x: d for d, (x, y) in enumerate(TARGET_CELLS.get(TARGET_DAY, []))}
+# 不超过这个格数的区域去掉留空格后可能恰好是一块积木，需要检查形状
+SMALL_ZONE_SIZE = max(BRICK_SIZES) + 2
+# 尚未留出的格子：月份格、日期格
+HOLE_MONTH = 1
+HOLE_DAY = 2
+
+
+def bit_cells(mask: int) -> List[int]:
+    """
+    把掩码拆分为单个格子的位
+    """
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low)
+        mask ^= low
+    return cells
+
+
+class SinglePassSearch:
+    """
+    一次搜索枚举所有日期的解：在整个日历板上拼8块积木，恰好留出一个月份格和一个日期格
+    与BitSearch相同，每一步覆盖首个空格，可以用任一剩余积木，也可以把它留作月份格或日期格（各一次）
+    每种拼法只对应一条搜索路径，按留出的(月份, 日期)归档
+    """
+
+    def __init__(self):
+        self.tries = 0
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES
+        self.prunes = [0] * len(PRUNE_RULES)
+        # 小区域的可行留空方式缓存：(区域, 剩余积木, 尚未留出的格子) -> 可行的留空方式集合
+        self.__options: Dict[Tuple[int, int, int], int] = {}
+
+    @staticmethod
+    def __zone_fits(zone: int, remaining: int) -> bool:
+        """
+        去掉留空格后的区域能否用剩余积木拼满（与check_zones的格数和形状规则相同）
+        """
+        length = zone.bit_count()
+        if length == 0:
+            return True
+        if length < MIN_BRICK_SIZE or not fillable_sizes(remaining) >> length & 1:
+            return False
+        if length < 2 * MIN_BRICK_SIZE:
+            return ZONE_BRICKS.get(zone, 0) & remaining != 0
+        return True
+
+    def __zone_options(self, zone: int, remaining: int, holes: int) -> int:
+        """
+        区域可行的留空方式集合：第o位为1表示区域内恰好留出o所示的格子（HOLE_MONTH/HOLE_DAY的组合）
+        """
+        length = zone.bit_count()
+        small = length <= SMALL_ZONE_SIZE
+        if small:
+            key = (zone, remaining, holes)
+            options = self.__options.get(key)
+            if options is not None:
+                return options
+        options = 0
+        for o in range(4):
+            if o & ~holes:
+                continue
+            if o & HOLE_MONTH and not zone & MONTH_MASK or o & HOLE_DAY and not zone & DAY_MASK:
+                continue
+            if not small:
+                # 去掉留空格后比最大的积木还大，只需检查格数
+                if fillable_sizes(remaining) >> (length - bin(o).count("1")) & 1:
+                    options |= 1 << o
+                continue
+            months = bit_cells(zone & MONTH_MASK) if o & HOLE_MONTH else [0]
+            days = bit_cells(zone & DAY_MASK) if o & HOLE_DAY else [0]
+            if any(self.__zone_fits(zone & ~m & ~d, remaining) for m in months for d in days):
+                options |= 1 << o
+        if small:
+            self.__options[key] = options
+        return options
+
+    def check_zones(self, free: int, remaining: int, holes: int) -> bool:
+        """
+        检查每个空白区域能否拼满，holes为尚未留出的格子（HOLE_MONTH/HOLE_DAY的组合）
+        没有留空时与check_zones相同；否则每个尚未留出的格子都要恰好落在一个区域内
+        """
+        if holes == 0:
+            return check_zones(free, remaining, self.prunes)
+        # 已能留出的格子组合的集合（第u位为1表示组合u可行）
+        reach = 1
+        while free:
+            zone = free & -free
+            while True:
+                grown = (zone | ((zone << 1) & ~COLUMN_FIRST_MASK) | ((zone >> 1) & ~COLUMN_LAST_MASK)
+                         | (zone << BOARD_WIDTH) | (zone >> BOARD_WIDTH)) & free
+                if grown == zone:
+                    break
+                zone = grown
+            free ^= zone
+
+            options = self.__zone_options(zone, remaining, holes)
+            merged = 0
+            for u in range(4):
+                if reach >> u & 1:
+                    for o in range(4):
+                        if options >> o & 1 and not u & o:
+                            merged |= 1 << (u | o)
+            reach = merged
+            if reach == 0:
+                self.prunes[PRUNE_ZONE_SIZE_MOD_5] += 1
+                return False
+        if not reach >> holes & 1:
+            self.prunes[PRUNE_ZONE_SIZE_MOD_5] += 1
+            return False
+        return True
+
+    def search(self, occupied: int, remaining: int, month: int, day: int, solution: List[Tuple[int, int]]) \
+            -> Iterator[Tuple[int, int, Tuple[int, ...]]]:
+        """
+        逐个生成(月份, 日期, 放置序号元组)，month/day为-1表示尚未留出
+        """
+        free = ~occupied & FULL_MASK
+        if free == 0:
+            yield month, day, compact(solution)
+            return
+        low = free & -free
+        cell = low.bit_length() - 1
+        rest = free ^ low
+        holes = (HOLE_MONTH if month < 0 else 0) | (HOLE_DAY if day < 0 else 0)
+
+        # 留作月份格或日期格
+        if month < 0 and low & MONTH_MASK:
+            if self.check_zones(rest, remaining, holes & ~HOLE_MONTH):
+                self.tries += 1
+                yield from self.search(occupied | low, remaining, CELL_MONTHS[cell], day, solution)
+        if day < 0 and low & DAY_MASK:
+            if self.check_zones(rest, remaining, holes & ~HOLE_DAY):
+                self.tries += 1
+                yield from self.search(occupied | low, remaining, month, CELL_DAYS[cell], solution)
+
+        # 用剩余积木覆盖
+        for i in range(len(BRICKS)):
+            if not remaining >> i & 1:
+                continue
+            for j, mask in FIRST_CELL_PLACEMENTS[i][cell]:
+                if mask & occupied:
+                    self.prunes[PRUNE_OVERLAP] += 1
+                    continue
+                if not self.check_zones(free & ~mask, remaining & ~(1 << i), holes):
+                    continue
+                self.tries += 1
+                solution.append((i, j))
+                yield from self.search(occupied | mask, remaining & ~(1 << i), month, day, solution)
+                solution.pop()
+
+
+def iter_all_dates() -> Iterator[Tuple[int, int, Tuple[int, ...]]]:
+    """
+    一次搜索逐个生成所有日期的所有解(月份, 日期, 放置序号元组)，月份和日期从0开始
+    """
+    return SinglePassSearch().search(~OPEN_MASK & FULL_MASK, ALL_BRICKS, -1, -1, [])
+
+
+def enumerate_all_dates(keep_solutions: bool = False) -> Dict[Tuple[int, int], List]:
+    """
+    一次搜索统计所有日期：(月份, 日期) -> [解的个数, 第一个解, 所有解（keep_solutions为True时）]
+    """
+    buckets = {}
+    for month in range(len(TARGET_CELLS[TARGET_MONTH])):
+        for day in range(len(TARGET_CELLS[TARGET_DAY])):
+            buckets[(month, day)] = [0, None, []]
+    for month, day, placements in iter_all_dates():
+        bucket = buckets[(month, day)]
+        bucket[0] += 1
+        if bucket[1] is None:
+            bucket[1] = placements
+        if keep_solutions:
+            bucket[2].append(placements)
+    return buckets
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Enumerate the solutions of every date in a single search")
+    parser.add_argument("--output", help="write per-date counts and first solutions as JSON")
+    options = parser.parse_args(args)
+
+    start_time = time.time()
+    buckets = enumerate_all_dates()
+    seconds = time.time() - start_time
+    report = []
+    for (month, day), (count, first, solutions) in sorted(buckets.items()):
+        report.append({"month": month + 1, "day": day + 1, "count": count,
+                       "first": list(first) if first is not None else None})
+        print("%02d-%02d: %s solutions" % (month + 1, day + 1, count))
+    total = sum(r["count"] for r in report)
+    print("%s solutions for %s dates in %.3f seconds" % (total, len(report), seconds))
+    if options.output is not None:
+        with open(options.output, "w") as output:
+            json.dump({"seconds": seconds, "solutions": total, "dates": report}, output, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
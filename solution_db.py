@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+from typing import List, Tuple
+import config_select
+
+if __name__ == '__main__':
+    # 在导入搜索代码之前按命令行的--config选择配置
+    config_select.select_config()
+
+from encoding import decode_placements, encode_placements, table_digest, unpack_solutions
+
+# 文件格式（小端）：
+#   文件头：魔数(4) 版本(H) 积木数(H) 月份数(H) 日期数(H) 日历板摘要(20) 放置表摘要(20)
+#   索引：每个日期一项 (解的偏移 I, 解的个数 I)，按 month * 日期数 + day 排列
+#   解：每个解占 积木数 个字节，依次为各积木的放置序号（见encoding）
+DB_MAGIC = b"CPDB"
+DB_VERSION = 2
+DB_HEADER = struct.Struct("<4sHHHH20s20s")
+DB_INDEX = struct.Struct("<II")
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calendar.db")
+
+
+
+def layout_digest() -> bytes:
+    """
+    当前日历板布局的摘要（见model.CONFIG_ENV），日历板变化后旧的解库失效
+    """
+    from model import LAYOUT
+
+    return hashlib.sha1("\n".join(LAYOUT).encode()).digest()
+
+
+def build(file: str = DB_FILE):
+    """
+    求解所有(月份, 日期)并写入解库
+    """
+    # 仅构建时需要搜索代码；一次搜索得到所有日期的解
+    from bitboard import BRICKS, TARGET_CELLS, TARGET_DAY, TARGET_MONTH
+    from single_pass import enumerate_all_dates
+
+    month_count = len(TARGET_CELLS[TARGET_MONTH])
+    day_count = len(TARGET_CELLS[TARGET_DAY])
+    buckets = enumerate_all_dates(keep_solutions=True)
+    index = []
+    solutions = bytearray()
+    for month in range(month_count):
+        for day in range(day_count):
+            count, first, placements = buckets[(month, day)]
+            index.append((len(solutions), count))
+            for p in placements:
+                solutions += encode_placements(p)
+            print("[SolutionDB] %s/%s: %s solutions" % (month + 1, day + 1, count))
+
+    with open(file, "wb") as db:
+        db.write(DB_HEADER.pack(DB_MAGIC, DB_VERSION, len(BRICKS), month_count, day_count, layout_digest(),
+                                 table_digest()))
+        for entry in index:
+            db.write(DB_INDEX.pack(*entry))
+        db.write(solutions)
+
+
+class SolutionDB:
+    """解库（内存映射，只读），不依赖搜索代码"""
+
+    def __init__(self, file: str = DB_FILE):
+        self.__file = open(file, "rb")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.__mmap) < DB_HEADER.size or self.__mmap[:4] != DB_MAGIC \
+                or struct.unpack_from("<H", self.__mmap, 4)[0] != DB_VERSION:
+            self.close()
+            raise ValueError("Invalid solution database: %s" % file)
+        magic, version, self.brick_count, self.month_count, self.day_count, self.digest, self.table_digest = \
+            DB_HEADER.unpack_from(self.__mmap, 0)
+        self.__data_offset = DB_HEADER.size + DB_INDEX.size * self.month_count * self.day_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.__mmap.close()
+        self.__file.close()
+
+    def is_stale(self) -> bool:
+        """
+        日历板或放置表是否已变化（放置表摘要在首次调用时由bitboard计算）
+        """
+        return self.digest != layout_digest() or self.table_digest != table_digest()
+
+    def __entry(self, month: int, day: int) -> Tuple[int, int]:
+        assert 0 <= month < self.month_count and 0 <= day < self.day_count
+        return DB_INDEX.unpack_from(self.__mmap, DB_HEADER.size + DB_INDEX.size * (month * self.day_count + day))
+
+    def count(self, month: int, day: int) -> int:
+        """
+        指定日期的解的个数
+        """
+        return self.__entry(month, day)[1]
+
+    def get(self, month: int, day: int, k: int = 0) -> Tuple[int, ...]:
+        """
+        指定日期的第k个解（放置序号元组，可用bitboard.to_board转换为Board），不存在时返回None
+        """
+        offset, count = self.__entry(month, day)
+        if not 0 <= k < count:
+            return None
+        start = self.__data_offset + offset + k * self.brick_count
+        return decode_placements(self.__mmap[start:start + self.brick_count])
+
+    def solutions(self, month: int, day: int) -> List[bytes]:
+        """
+        指定日期的所有解（编码），一次读出
+        """
+        offset, count = self.__entry(month, day)
+        start = self.__data_offset + offset
+        return unpack_solutions(self.__mmap[start:start + count * self.brick_count], self.brick_count)
+
+
+def open_current(file: str = DB_FILE) -> SolutionDB:
+    """
+    打开与当前日历板和放置表一致的解库，文件不存在、格式版本不同或已过期时返回None
+    """
+    if file is None or not os.path.exists(file):
+        return None
+    try:
+        db = SolutionDB(file)
+    except ValueError:
+        return None
+    if db.is_stale():
+        db.close()
+        return None
+    return db
+
+
+def main(args: List[str] = None):
+    parser = argparse.ArgumentParser(description="Solve every month/day combination into a solution database")
+    parser.add_argument("--config", help="JSON puzzle config (default: calendar.data with the built-in bricks)")
+    parser.add_argument("--output", default=DB_FILE, help="database file")
+    options = parser.parse_args(args)
+
+    if options.config is not None:
+        from puzzle_config import use_config
+        use_config(options.config)
+    build(options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import threading
+import time
+from model import *
+from bitboard import ALL_BRICKS, BitBoard, BitSearch, blocked_mask, compact, from_board, to_board
+from exact_cover import ExactCoverSolver
+from constrained import ConstrainedSearch
+from vectorized import VectorSearch
+from parallel import process_main
+from portfolio import RandomizedSearch, portfolio_main
+from transposition import TranspositionTable
+from instrument import Instrument, SearchStats
+from cancel import CancelToken, SolveInterrupted
+from engines import ENGINE_BITBOARD, ENGINE_CONSTRAINED, ENGINE_EXACT_COVER, ENGINE_GRID, ENGINE_PORTFOLIO, \
+    ENGINE_PROCESS_POOL, ENGINE_VECTORIZED, GridEngine
+
+# 搜索引擎（名称见engines）
+# 按记录的统计为每个日期选择引擎和并行数（见adaptive）
+ENGINE_ADAPTIVE = "adaptive"
+ENGINES = [ENGINE_GRID, ENGINE_BITBOARD, ENGINE_EXACT_COVER, ENGINE_PROCESS_POOL, ENGINE_CONSTRAINED,
+           ENGINE_VECTORIZED, ENGINE_PORTFOLIO, ENGINE_ADAPTIVE]
+
+# 基于搜索类的引擎：单线程直接搜索，多进程时按子树拆分
+SEARCH_CLASSES = {
+    ENGINE_PROCESS_POOL: BitSearch,
+    ENGINE_CONSTRAINED: ConstrainedSearch,
+    ENGINE_VECTORIZED: VectorSearch,
+}
+
+# 每月天数（含2月29日）
+MONTH_DAYS = [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+def all_dates() -> List[Tuple[int, int]]:
+    """
+    一年中所有的日期（月份和日期从1开始，含2月29日，共366天）
+    """
+    return [(m + 1, d + 1) for m in range(12) for d in range(MONTH_DAYS[m])]
+
+
+def parallel_main(canvas: "Canvas", month: int, day: int, engine: str = ENGINE_GRID, workers: int = None,
+                  instrument: Instrument = None, token: CancelToken = None, timeout: float = None) \
+        -> (float, int, Tuple[int, ...], SearchStats):
+    """
+    多线程解谜，canvas为None时不绘制（无界面模式），workers为线程数或进程数，默认为CPU核数
+    返回(耗时, 步数, 紧凑谜底, 搜索统计)，无解时谜底为None
+    instrument为进度回调、统计信息和性能剖析选项，默认都不输出（打印进度可传入Instrument(print_progress)）
+    token为取消令牌，timeout为超时秒数，被取消或超时时抛出SolveInterrupted
+    engine为adaptive时由统计选择引擎和并行数（忽略workers），并记录本次求解
+    """
+    if engine == ENGINE_ADAPTIVE:
+        from adaptive import solve_adaptive
+        return solve_adaptive(canvas, month, day, instrument, token, timeout)
+
+    if instrument is None:
+        instrument = Instrument()
+    instrument.start_time = time.time()
+    if token is None:
+        token = CancelToken()
+    if timeout is not None:
+        token.set_deadline(instrument.start_time + timeout)
+    # 本次求解的统计（所有线程或进程合计）
+    stats = SearchStats()
+    if instrument.profiler is not None:
+        instrument.profiler.start()
+    try:
+        placements = __solve(month, day, engine, workers, instrument, token, stats)
+    except SolveInterrupted as e:
+        raise SolveInterrupted(e.reason, time.time() - instrument.start_time, stats.placements)
+    finally:
+        if instrument.profiler is not None:
+            instrument.profiler.stop()
+    if token.is_set():
+        # 截止时间之后才找到的解也按超时处理
+        raise SolveInterrupted(token.reason, time.time() - instrument.start_time, stats.placements)
+    if placements is not None and canvas is not None:
+        to_board(month, day, placements).draw(canvas)
+    return (time.time() - instrument.start_time), stats.placements, placements, stats
+
+
+def __solve(month: int, day: int, engine: str, workers: int, instrument: Instrument, token: CancelToken,
+            stats: SearchStats) -> Tuple[int, ...]:
+    if engine == ENGINE_EXACT_COVER:
+        # 精确覆盖无需枚举积木顺序，单线程即可
+        if instrument.profiler is not None:
+            with instrument.profiler.profile_thread():
+                return solve_exact_cover(month, day, token, stats)
+        return solve_exact_cover(month, day, token, stats)
+    if engine in SEARCH_CLASSES and engine != ENGINE_PROCESS_POOL and workers == 1:
+        # 最强约束格搜索不需要枚举积木顺序，单线程即可
+        if instrument.profiler is not None:
+            with instrument.profiler.profile_thread():
+                return solve_search(month, day, SEARCH_CLASSES[engine], token, stats)
+        return solve_search(month, day, SEARCH_CLASSES[engine], token, stats)
+    if engine in SEARCH_CLASSES or engine == ENGINE_PORTFOLIO:
+        # 多进程解谜，不受GIL限制（性能剖析只覆盖主进程）
+        if engine == ENGINE_PORTFOLIO:
+            # 各进程用不同种子的随机顺序搜索，取最先找到的解
+            result = portfolio_main(month, day, workers, token=token, instrument=instrument)
+        else:
+            result = process_main(month, day, workers, token=token, search_class=SEARCH_CLASSES[engine],
+                                  instrument=instrument)
+        if result is None:
+            return None
+        stats.nodes = stats.placements = result[1]
+        stats.prunes = result[3]
+        return result[2]
+
+    if workers is None:
+        workers = os.cpu_count()
+    # 置换表：记录已失败的局面（占用情况 + 剩余积木 + 下一块积木），各线程共用
+    failed_states = TranspositionTable()
+    # 第一个解找到后通知其它线程停止
+    solved = threading.Event()
+    threads = []
+    for i in range(workers):
+        if token.is_set():
+            # 已取消或超时，不再启动其它线程（已启动的线程会自行停止）
+            break
+        worker = Worker(month, day, i, engine, workers, instrument, token, solved, failed_states)
+        worker.start()
+        threads.append(worker)
+    for w in threads:
+        w.join()
+        # 合并各线程的统计
+        stats.merge(w.stats)
+    if instrument.log is not None:
+        instrument.log("[TranspositionTable] %s" % failed_states.stats())
+    # 多个线程同时找到解时采用序号最小的线程的解
+    return next((w.solution for w in threads if w.solution is not None), None)
+
+
+class Worker(threading.Thread):
+    def __init__(self, month: int, day: int, slot: int, engine: str = ENGINE_GRID, slots: int = None,
+                 instrument: Instrument = None, token: CancelToken = None, solved: threading.Event = None,
+                 failed_states: TranspositionTable = None):
+        threading.Thread.__init__(self)
+        self.__slot = slot
+        self.__solved = solved if solved is not None else threading.Event()
+        self.__instrument = instrument if instrument is not None else Instrument()
+        # 各线程共用置换表和停止信号
+        self.__engine = GridEngine(engine == ENGINE_BITBOARD, failed_states,
+                                   token if token is not None else CancelToken(), self.__solved, self.__instrument,
+                                   slot)
+        self.__board = self.__engine.new_board(month, day)
+        self.__factory = BrickSeqFactory(BRICKS, slot, slots)
+        # 本线程的统计，结束后由parallel_main合并
+        self.stats = self.__engine.stats
+        # 本线程找到的解（紧凑谜底）
+        self.solution: Tuple[int, ...] = None
+
+    @property
+    def board(self) -> Board:
+        return self.__board
+
+    def run(self):
+        profiler = self.__instrument.profiler
+        if profiler is None:
+            self.__run()
+        else:
+            with profiler.profile_thread():
+                self.__run()
+
+    def __run(self):
+        if self.__instrument.log is not None:
+            self.__instrument.log("[Worker-%s] Started" % self.__slot)
+        try:
+            while not self.__solved.is_set():
+                bricks = self.__factory.next()
+                if len(bricks) == 0:
+                    # 已遍历完所有可能
+                    break
+                if self.__engine.place_bricks(self.__board, bricks):
+                    # 找到一个解，通知其它线程停止
+                    board = self.__board
+                    self.solution = from_board(board.to_board() if isinstance(board, BitBoard) else board)
+                    self.__solved.set()
+                    break
+        except SolveInterrupted:
+            # 其它线程已找到解，或者已取消/超时
+            pass
+
+
+def main(month: int, day: int, engine: str = ENGINE_GRID):
+    """
+    单线程解谜（用于Debug）
+    """
+    if engine == ENGINE_ADAPTIVE:
+        from adaptive import SINGLE_PROCESS_ENGINES, default_store
+        engine = default_store().choose(month, day, [(e, 1) for e in SINGLE_PROCESS_ENGINES])[0]
+
+    start_time = time.time()
+    if engine == ENGINE_EXACT_COVER or engine in SEARCH_CLASSES or engine == ENGINE_PORTFOLIO:
+        placements = solve_exact_cover(month, day) if engine == ENGINE_EXACT_COVER \
+            else solve_search(month, day, SEARCH_CLASSES.get(engine, RandomizedSearch))
+        if placements is not None:
+            print("\nA solution is found after %s seconds!" % (time.time() - start_time))
+            print(to_board(month, day, placements))
+            exit()
+        print("\nSomething is wrong... No solution is found!")
+        return
+
+    # 每次放置后打印并绘制日历板
+    placements = GridEngine(engine == ENGINE_BITBOARD, trace=trace_board).solve(month, day)
+    if placements is not None:
+        print("\nA solution is found after %s seconds!" % (time.time() - start_time))
+        to_board(month, day, placements).draw()
+        exit()
+    print("\nSomething is wrong... No solution is found!")
+
+
+def trace_board(board: Board):
+    print(board)
+    board.draw(1000)
+
+
+def solve_exact_cover(month: int, day: int, token: CancelToken = None, stats: SearchStats = None) \
+        -> Tuple[int, ...]:
+    """
+    精确覆盖解谜，返回紧凑谜底（无解时为None），步数累计到stats
+    """
+    solver = ExactCoverSolver(month, day, token)
+    try:
+        board = solver.solve()
+    finally:
+        if stats is not None:
+            stats.nodes += solver.tries
+            stats.placements += solver.tries
+    return from_board(board) if board is not None else None
+
+
+def solve_search(month: int, day: int, search_class: type, token: CancelToken = None, stats: SearchStats = None) \
+        -> Tuple[int, ...]:
+    """
+    用搜索类（BitSearch、ConstrainedSearch、VectorSearch或RandomizedSearch）单线程解谜，返回紧凑谜底，
+    无解或token被取消、超时时返回None；步数和剪枝次数累计到stats
+    """
+    search = search_class(token)
+    solution = []
+    found = search.solve(blocked_mask(month, day), ALL_BRICKS, solution)
+    if stats is not None:
+        stats.nodes += search.tries
+        stats.placements += search.tries
+        for i, n in enumerate(search.prunes):
+            stats.prunes[i] += n
+    return compact(solution) if found else None
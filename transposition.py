@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+
+# 淘汰策略
+EVICTION_LRU = "lru"
+EVICTION_FIFO = "fifo"
+
+# 默认容量（局面数）
+DEFAULT_CAPACITY = 1 << 20
+
+
+class TranspositionTable:
+    """置换表：记录已搜索失败的局面，容量有限，线程安全"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, eviction: str = EVICTION_LRU):
+        assert capacity > 0
+        assert eviction in (EVICTION_LRU, EVICTION_FIFO)
+        self.__capacity = capacity
+        self.__eviction = eviction
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key: int) -> bool:
+        with self.__lock:
+            if key in self.__entries:
+                self.hits += 1
+                if self.__eviction == EVICTION_LRU:
+                    self.__entries.move_to_end(key)
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key: int):
+        with self.__lock:
+            self.__entries[key] = None
+            if self.__eviction == EVICTION_LRU:
+                self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__capacity:
+                self.__entries.popitem(False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        命中统计
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.__entries),
+                "capacity": self.__capacity,
+                "eviction": self.__eviction,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            }
+
+
+def state_key(occupied: int, remaining: int, brick_number: int) -> int:
+    """
+    局面键：占用掩码（低64位）、剩余积木集合（每块积木1位）和下一块积木的序号
+    """
+    return (((brick_number << 16) | remaining) << 64) | occupied
@@ -0,0 +1,69 @@
+from typing import List, Tuple
+from model import *
+
+# 预置积木 -> 合法朝向集合
+LEGAL_ORIENTATIONS = {raw: set(ORIENTATIONS[raw]) for raw in BRICKS}
+
+
+def validate_bricks(month: int, day: int, bricks: List[Tuple[Grid, Brick]]) -> List[str]:
+    """
+    独立校验一个解（月份和日期从0开始），bricks为[(左上角, 积木朝向)]（与Board.bricks相同）
+    只按日历板布局和积木形状逐格检查，不使用搜索代码的放置表和掩码；返回错误说明，合法时为空列表
+    """
+    errors = []
+    month_cell = TARGET_CELLS[TARGET_MONTH][month]
+    day_cell = TARGET_CELLS[TARGET_DAY][day]
+    # 格子 -> 覆盖它的积木序号
+    covered = {}
+    used = set()
+    for location, brick in bricks:
+        n = next((n for n, raw in enumerate(BRICKS) if brick in LEGAL_ORIENTATIONS[raw]), None)
+        if n is None:
+            errors.append("(%s, %s): not a legal orientation of any brick" % (location.x, location.y))
+            continue
+        if n in used:
+            errors.append("brick %s is used twice" % n)
+        used.add(n)
+        for dy, row in enumerate(brick.key):
+            for dx, g in enumerate(row):
+                if g != 1:
+                    continue
+                x = location.x + dx
+                y = location.y + dy
+                if not (0 <= y < len(LAYOUT) and 0 <= x < len(LAYOUT[y])) or LAYOUT[y][x] == FORBIDDEN_CHAR:
+                    errors.append("brick %s covers (%s, %s) outside the board" % (n, x, y))
+                elif (x, y) == month_cell or (x, y) == day_cell:
+                    errors.append("brick %s covers the date cell (%s, %s)" % (n, x, y))
+                elif (x, y) in covered:
+                    errors.append("bricks %s and %s overlap at (%s, %s)" % (covered[(x, y)], n, x, y))
+                else:
+                    covered[(x, y)] = n
+    for n in range(len(BRICKS)):
+        if n not in used:
+            errors.append("brick %s is missing" % n)
+    for y, row in enumerate(LAYOUT):
+        for x, c in enumerate(row):
+            if c != FORBIDDEN_CHAR and (x, y) not in covered and (x, y) != month_cell and (x, y) != day_cell:
+                errors.append("(%s, %s) is not covered" % (x, y))
+    return errors
+
+
+def validate_placements(month: int, day: int, placements: Tuple[int, ...]) -> List[str]:
+    """
+    校验放置序号元组形式的解：序号只用于查出积木朝向和左上角，覆盖关系由validate_bricks逐格检查
+    """
+    from bitboard import BRICK_PLACEMENTS
+
+    if len(placements) != len(BRICKS):
+        return ["%s placements for %s bricks" % (len(placements), len(BRICKS))]
+    bricks = []
+    errors = []
+    for i, j in enumerate(placements):
+        if not 0 <= j < len(BRICK_PLACEMENTS[i]):
+            errors.append("brick %s has no placement %s" % (i, j))
+            continue
+        brick, anchor, mask = BRICK_PLACEMENTS[i][j]
+        if brick not in LEGAL_ORIENTATIONS[BRICKS[i]]:
+            errors.append("placement %s of brick %s has the orientation of another brick" % (j, i))
+        bricks.append((Grid(anchor % BOARD_WIDTH, anchor // BOARD_WIDTH), brick))
+    return errors + validate_bricks(month, day, bricks)
@@ -0,0 +1,164 @@
+from typing import Iterator, List, Tuple
+import numpy as np
+from numpy import ndarray
+from bitboard import *
+
+# 所有积木的所有放置方式按(积木序号, 放置序号)顺序堆叠：
+# PLACEMENT_MATRIX[k]为第k种放置方式覆盖的格子（布尔数组），PLACEMENT_MASKS[k]为对应的掩码
+PLACEMENT_BRICKS: ndarray = None
+PLACEMENT_INDEXES: ndarray = None
+PLACEMENT_MASKS: ndarray = None
+PLACEMENT_MATRIX: ndarray = None
+
+
+def __init_tables():
+    global PLACEMENT_BRICKS
+    global PLACEMENT_INDEXES
+    global PLACEMENT_MASKS
+    global PLACEMENT_MATRIX
+
+    bricks = []
+    indexes = []
+    masks = []
+    for i, placements in enumerate(BRICK_PLACEMENTS):
+        for j, p in enumerate(placements):
+            bricks.append(i)
+            indexes.append(j)
+            masks.append(p[2])
+    PLACEMENT_BRICKS = np.array(bricks, np.int64)
+    PLACEMENT_INDEXES = np.array(indexes, np.int64)
+    # 日历板不超过64格（见puzzle_config.MAX_BOARD_SIZE），掩码可以放进uint64
+    PLACEMENT_MASKS = np.array(masks, np.uint64)
+    PLACEMENT_MATRIX = (PLACEMENT_MASKS[:, None] >> np.arange(BOARD_SIZE, dtype=np.uint64)) & np.uint64(1) == 1
+    for a in (PLACEMENT_BRICKS, PLACEMENT_INDEXES, PLACEMENT_MASKS, PLACEMENT_MATRIX):
+        a.flags.writeable = False
+
+
+__init_tables()
+
+
+class VectorSearch:
+    """
+    向量化的最强约束格搜索：与ConstrainedSearch的搜索顺序和步数相同
+    每层用NumPy批量过滤合法放置方式、统计每个空格和每块积木的合法放置方式数，只有区域检查仍逐个进行
+    """
+
+    # 每隔多少步检查一次是否已取消
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, cancel_event=None):
+        self.tries = 0
+        self.cancelled = False
+        # 各剪枝规则的剪枝次数，见PRUNE_RULES（某个空格已无法覆盖时计入overlap）
+        self.prunes = [0] * len(PRUNE_RULES)
+        self.__cancel_event = cancel_event
+
+    @staticmethod
+    def legal_placements(occupied: int, remaining: int) -> ndarray:
+        """
+        剩余积木所有不与已占用格重叠的放置方式（堆叠表下标）
+        """
+        fits = (PLACEMENT_MASKS & np.uint64(occupied)) == 0
+        fits &= (remaining >> PLACEMENT_BRICKS) & 1 == 1
+        return np.flatnonzero(fits)
+
+    def __choose(self, occupied: int, remaining: int, legal: ndarray) -> List[Tuple[int, int, int]]:
+        """
+        选出合法放置方式最少的空格，返回覆盖它的候选放置方式[(积木序号, 放置序号, 掩码)]
+        候选按积木的合法放置方式数从少到多排序（先放最难放的积木）
+        """
+        brick_counts = np.bincount(PLACEMENT_BRICKS[legal], minlength=len(BRICKS))
+        for i in range(len(BRICKS)):
+            if remaining >> i & 1 and brick_counts[i] == 0:
+                # 这块积木已无处可放
+                self.prunes[PRUNE_OVERLAP] += 1
+                return []
+
+        covering = PLACEMENT_MATRIX[legal]
+        cell_counts = covering.sum(axis=0)
+        # 已占用格不参与选择
+        cell_counts[(np.uint64(occupied) >> np.arange(BOARD_SIZE, dtype=np.uint64)) & np.uint64(1) == 1] = \
+            len(legal) + 1
+        best = int(np.argmin(cell_counts))
+        if cell_counts[best] == 0:
+            # 这个空格已无法覆盖
+            self.prunes[PRUNE_OVERLAP] += 1
+            return []
+
+        chosen = legal[covering[:, best]]
+        # 稳定排序，保持同一积木内的放置顺序
+        chosen = chosen[np.argsort(brick_counts[PLACEMENT_BRICKS[chosen]], kind="stable")]
+        free = ~occupied & FULL_MASK
+        result = []
+        for i, j, mask in zip(PLACEMENT_BRICKS[chosen].tolist(), PLACEMENT_INDEXES[chosen].tolist(),
+                              PLACEMENT_MASKS[chosen].tolist()):
+            # 检查是否有孤立的非法空白区域
+            if not check_zones(free & ~mask, remaining & ~(1 << i), self.prunes):
+                continue
+            result.append((i, j, mask))
+        return result
+
+    def candidates(self, occupied: int, remaining: int) -> List[Tuple[int, int, int]]:
+        """
+        覆盖最强约束格的所有合法放置方式[(积木序号, 放置序号, 掩码)]
+        """
+        return self.__choose(occupied, remaining, self.legal_placements(occupied, remaining))
+
+    @staticmethod
+    def __narrow(legal: ndarray, i: int, mask: int) -> ndarray:
+        # 放置积木i后仍然合法的放置方式
+        return legal[((PLACEMENT_MASKS[legal] & np.uint64(mask)) == 0) & (PLACEMENT_BRICKS[legal] != i)]
+
+    def solve(self, occupied: int, remaining: int, solution: List[Tuple[int, int]]) -> bool:
+        """
+        搜索一个解，找到时solution为完整的放置列表
+        """
+        return self.__solve(occupied, remaining, self.legal_placements(occupied, remaining), solution)
+
+    def __solve(self, occupied: int, remaining: int, legal: ndarray, solution: List[Tuple[int, int]]) -> bool:
+        if remaining == 0:
+            return True
+        for i, j, mask in self.__choose(occupied, remaining, legal):
+            self.tries += 1
+            if self.tries % self.CHECK_INTERVAL == 0 and self.__cancel_event is not None \
+                    and self.__cancel_event.is_set():
+                self.cancelled = True
+            if self.cancelled:
+                return False
+            solution.append((i, j))
+            if self.__solve(occupied | mask, remaining & ~(1 << i), self.__narrow(legal, i, mask), solution):
+                return True
+            solution.pop()
+        return False
+
+    def iter_solutions(self, occupied: int, remaining: int) -> Iterator[Tuple[int, ...]]:
+        """
+        逐个生成所有解（放置序号元组），每种拼法只生成一次
+        """
+        return self.__iter(occupied, remaining, self.legal_placements(occupied, remaining), [])
+
+    def __iter(self, occupied: int, remaining: int, legal: ndarray, solution: List[Tuple[int, int]]) \
+            -> Iterator[Tuple[int, ...]]:
+        if remaining == 0:
+            yield compact(solution)
+            return
+        for i, j, mask in self.__choose(occupied, remaining, legal):
+            self.tries += 1
+            solution.append((i, j))
+            yield from self.__iter(occupied | mask, remaining & ~(1 << i), self.__narrow(legal, i, mask), solution)
+            solution.pop()
+
+    def count(self, occupied: int, remaining: int) -> int:
+        """
+        只计数，不生成解
+        """
+        return self.__count(occupied, remaining, self.legal_placements(occupied, remaining))
+
+    def __count(self, occupied: int, remaining: int, legal: ndarray) -> int:
+        if remaining == 0:
+            return 1
+        total = 0
+        for i, j, mask in self.__choose(occupied, remaining, legal):
+            self.tries += 1
+            total += self.__count(occupied | mask, remaining & ~(1 << i), self.__narrow(legal, i, mask))
+        return total